@@ -3,89 +3,184 @@
 # GenerateAnkiDeck_cgpt.py
 # Reads verb JSON files, validates them, ensures stable GUIDs,
 # and generates Anki .apkg decks grouped by deck_guid.
+#
+# Each verb file is validated and flattened into a VerbRecord as it is read,
+# so the build holds one tuple of field values per verb rather than its
+# nested JSON. Verbs with fatal validation errors are left out.
 
 import argparse
+import functools
 import json
 import os
+import re
+import sys
 from pathlib import Path
-from typing import List
+from typing import NamedTuple
 
 import genanki
 
+from build_manifest import BuildManifest, deck_digest, model_digest
+from deck_packaging import (
+    DEFAULT_WRITER,
+    PACKAGE_WRITERS,
+    PendingPackage,
+    PlannedDeck,
+    package_settings,
+    write_pending,
+)
 from helpers import stable_id
+from id_service import default_service
+from instrumentation import BuildMetrics
+from model_cache import get_model, seed_req, template_signature
+from schema_validator import UNREADABLE, VERB_VALIDATOR, SchemaError
+from sharding import VERB_GROUP, ShardMap
+from source_validation import ValidationFailed, finish_validation, run_validation
+from verb_store import DEFAULT_IO_THREADS, open_verb_store
 from schemas import (
     ACTIVE_TENSES,
     CONJUGATION_FIELDS,
     IRREGULAR_VERB_MODEL_SEED,
     PP_FIELDS,
+    TRIM_VERB_MODEL_FIELDS,
+    VERB_FIELD_INDEX,
+    VERB_FIELD_NAMES,
     VERB_METADATA_FIELDS,
     VERB_MODEL_SEED,
     VERB_PERSONS,
     VERB_TENSES,
     build_verb_field_names,
-    validate_verb_data,
 )
 
 TEMPLATE_DIR = Path(__file__).parent / "templates" / "verb"
 
+# {{Field}}, {{#Field}}, {{^Field}}, {{/Field}} and {{filter:Field}} references
+FIELD_REFERENCE = re.compile(r"{{[#^/]?(?:[^{}:]+:)*([^{}:]+)}}")
+
 
 def _read_template(name: str) -> str:
     return (TEMPLATE_DIR / name).read_text(encoding="utf-8")
 
 
-def get_italian_verb_model(irregular=False) -> genanki.Model:
-    """
-    Build a genanki Model for Italian verbs using the canonical field schema.
-    The field list is deterministic and independent of any single verb file.
-    """
-    fields = [{"name": n} for n in build_verb_field_names()]
-
+# Templates are generated per tense on first use and shared by both models
+# (and every model built in this process); callers get copies because
+# genanki writes into template dicts when packaging. The caches are keyed on
+# the template files' signature, the same one model_cache keys models on, so
+# a template edited during --watch is read again rather than served stale.
+@functools.lru_cache(maxsize=1)
+def _infinitive_templates(signature: tuple) -> tuple:
     back_common = _read_template("back_common.html")
-    css = _read_template("card.css")
+    return (
+        {
+            "name": "Infinitive - En->It",
+            "qfmt": _read_template("infinitive_en_it.html"),
+            "afmt": _read_template("infinitive_en_it_back.html") + back_common,
+        },
+        {
+            "name": "Infinitive - It->En",
+            "qfmt": _read_template("infinitive_it_en.html"),
+            "afmt": _read_template("infinitive_it_en_back.html") + back_common,
+        },
+    )
 
-    templates = []
 
-    # Infinitive cards
-    templates.append({
-        "name": "Infinitive - En->It",
-        "qfmt": _read_template("infinitive_en_it.html"),
-        "afmt": _read_template("infinitive_en_it_back.html") + back_common,
-    })
-    templates.append({
-        "name": "Infinitive - It->En",
-        "qfmt": _read_template("infinitive_it_en.html"),
-        "afmt": _read_template("infinitive_it_en_back.html") + back_common,
-    })
-
-    # Conjugation cards — only for active tenses
+@functools.lru_cache(maxsize=len(VERB_TENSES))
+def _tense_templates(tense: str, signature: tuple) -> tuple:
+    """The En->It and It->En conjugation templates for every person of `tense`."""
+    back_common = _read_template("back_common.html")
     conj_en_it_front = _read_template("conjugation_en_it.html")
     conj_en_it_back = _read_template("conjugation_en_it_back.html")
     conj_it_en_front = _read_template("conjugation_it_en.html")
     conj_it_en_back = _read_template("conjugation_it_en_back.html")
 
+    templates = []
+    for person in VERB_PERSONS:
+        prefix = f"{tense}_{person}"
+        # Replace PREFIX and TENSE_NAME placeholders in templates
+        templates.append({
+            "name": f"{tense} {person} - En->It",
+            "qfmt": conj_en_it_front.replace("PREFIX", prefix),
+            "afmt": (conj_en_it_back.replace("PREFIX", prefix)
+                     .replace("TENSE_NAME", tense) + back_common),
+        })
+        templates.append({
+            "name": f"{tense} {person} - It->En",
+            "qfmt": conj_it_en_front.replace("PREFIX", prefix),
+            "afmt": (conj_it_en_back.replace("PREFIX", prefix)
+                     .replace("TENSE_NAME", tense) + back_common),
+        })
+    return tuple(templates)
+
+
+def verb_templates() -> list[dict]:
+    """Infinitive templates, then conjugation templates for each active tense in VERB_TENSES order."""
+    signature = tuple(map(tuple, template_signature(TEMPLATE_DIR)))
+    templates = [dict(t) for t in _infinitive_templates(signature)]
     for tense in VERB_TENSES:
-        if tense not in ACTIVE_TENSES:
-            continue
-        for person in VERB_PERSONS:
-            prefix = f"{tense}_{person}"
-            # Replace PREFIX and TENSE_NAME placeholders in templates
-            en_it_q = conj_en_it_front.replace("PREFIX", prefix)
-            en_it_a = (conj_en_it_back.replace("PREFIX", prefix)
-                       .replace("TENSE_NAME", tense) + back_common)
-            it_en_q = conj_it_en_front.replace("PREFIX", prefix)
-            it_en_a = (conj_it_en_back.replace("PREFIX", prefix)
-                       .replace("TENSE_NAME", tense) + back_common)
-
-            templates.append({
-                "name": f"{tense} {person} - En->It",
-                "qfmt": en_it_q,
-                "afmt": en_it_a,
-            })
-            templates.append({
-                "name": f"{tense} {person} - It->En",
-                "qfmt": it_en_q,
-                "afmt": it_en_a,
-            })
+        if tense in ACTIVE_TENSES:
+            templates.extend(dict(t) for t in _tense_templates(tense, signature))
+    return templates
+
+
+def template_field_names(templates) -> list[str]:
+    """The verb fields `templates` refer to, in canonical field order."""
+    used = set()
+    for template in templates:
+        used.update(FIELD_REFERENCE.findall(template["qfmt"]))
+        used.update(FIELD_REFERENCE.findall(template["afmt"]))
+    return [name for name in build_verb_field_names() if name in used]
+
+
+@functools.lru_cache(maxsize=None)
+def _template_req(field_names: tuple, qfmt: str) -> tuple:
+    """genanki's required-field rule for one front template, computed once per field list."""
+    model = genanki.Model(0, "req", fields=[{"name": n} for n in field_names],
+                          templates=[{"name": "req", "qfmt": qfmt, "afmt": ""}])
+    _, any_or_all, required = model._req[0]
+    return any_or_all, tuple(required)
+
+
+def model_field_positions(model: genanki.Model):
+    """
+    Where each of the model's fields is in extract_fields() output, or None
+    if the model has the full field list.
+    """
+    names = tuple(f["name"] for f in model.fields)
+    if names == VERB_FIELD_NAMES:
+        return None
+    return [VERB_FIELD_INDEX[name] for name in names]
+
+
+def get_italian_verb_model(irregular=False) -> genanki.Model:
+    """
+    Return the genanki Model for Italian verbs, rebuilding it only when the
+    verb templates or the tense/field schema have changed (see model_cache).
+    """
+    params = {
+        "irregular": irregular,
+        "active_tenses": ACTIVE_TENSES,
+        "tenses": VERB_TENSES,
+        "persons": VERB_PERSONS,
+        "fields": build_verb_field_names(),
+        "trim_fields": TRIM_VERB_MODEL_FIELDS,
+        "seeds": [VERB_MODEL_SEED, IRREGULAR_VERB_MODEL_SEED],
+    }
+    kind = "verb_irregular" if irregular else "verb"
+    return get_model(kind, TEMPLATE_DIR, params, lambda: build_italian_verb_model(irregular))
+
+
+def build_italian_verb_model(irregular=False, trim_fields=None) -> genanki.Model:
+    """
+    Build a genanki Model for Italian verbs using the canonical field schema.
+    The field list is deterministic and independent of any single verb file;
+    with `trim_fields` (default: TRIM_VERB_MODEL_FIELDS) it keeps only the
+    fields the active templates use.
+    """
+    if trim_fields is None:
+        trim_fields = TRIM_VERB_MODEL_FIELDS
+    templates = verb_templates()
+    field_names = template_field_names(templates) if trim_fields else build_verb_field_names()
+    fields = [{"name": n} for n in field_names]
+    css = _read_template("card.css")
 
     # WARNING: changing these seeds will break existing Anki decks.
     if not irregular:
@@ -95,43 +190,122 @@ def get_italian_verb_model(irregular=False) -> genanki.Model:
         model_id = stable_id(IRREGULAR_VERB_MODEL_SEED)
         model_name = "IrregularVerbs"
 
-    return genanki.Model(
+    model = genanki.Model(
         model_id,
         model_name,
         fields=fields,
         templates=templates,
         css=css,
     )
+    # Seed genanki's required-field scan from the per-template cache, so
+    # each template is scanned once per process rather than once per model
+    key = tuple(field_names)
+    req = []
+    for ord_, template in enumerate(templates):
+        any_or_all, required = _template_req(key, template["qfmt"])
+        req.append([ord_, any_or_all, list(required)])
+    return seed_req(model, req)
 
 
-def load_json_files(folder: str) -> List[dict]:
-    """Read all *.json files from the specified folder and return parsed data."""
-    path = Path(folder)
-    files = list(path.glob("*.json"))
-    print(f"Found {len(files)} files in {folder}")
-    return [json.loads(f.read_text(encoding="utf-8")) for f in files]
+class VerbRecord(NamedTuple):
+    """
+    One verb as the build carries it: its GUIDs, deck and model choice,
+    and its note fields in build_verb_field_names() order (offsets in
+    schemas.VERB_FIELD_INDEX).
+    """
+    note_guid: object
+    deck_guid: object
+    deck_name: str
+    regular: bool
+    fields: tuple
+
+    @property
+    def infinitive(self) -> str:
+        return self.fields[VERB_FIELD_INDEX["Infinitive"]]
+
+
+def verb_record(verb_data: dict) -> VerbRecord:
+    """Flatten a verb JSON dict into a VerbRecord."""
+    return VerbRecord(verb_data.get("note_guid"), verb_data.get("deck_guid"), verb_data.get("deck_name"),
+                      bool(verb_data["regular"]), tuple(extract_fields(verb_data)))
 
 
-def ensure_verb_guids(json_folder: str):
+def load_verb_corpus(json_folder: str, metrics: BuildMetrics = None,
+                     io_threads: int = DEFAULT_IO_THREADS, errors: list = None) -> list[VerbRecord]:
     """
-    Assign note_guid to any verb JSON files that lack one.
-    This is a separate preparatory step that runs before generation,
-    keeping generation itself read-only.
+    Load every verb once from a folder of per-verb JSON files or a .jsonl
+    verb store, with up to `io_threads` file reads in flight. Each verb is
+    validated as it is read; its SchemaErrors are appended to `errors`, and
+    verbs that are unreadable or have fatal errors are skipped. Verbs that
+    lack a note_guid get one, and if the source has a shard map (see
+    sharding.py) deck_guid and deck_name come from it. Each verb is then
+    flattened into a VerbRecord, so only the verbs that changed (and are
+    written back) stay in memory as JSON. Returns the records sorted by
+    filename.
     """
-    folder = Path(json_folder)
-    updated = 0
-    for json_file in folder.glob("*.json"):
-        data = json.loads(json_file.read_text(encoding="utf-8"))
-        if not data.get("note_guid"):
-            data["note_guid"] = stable_id(data["infinitive"])
-            json_file.write_text(
-                json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-            )
-            print(f"  Added note_guid to {data['infinitive']}")
-            updated += 1
+    if metrics is None:
+        metrics = BuildMetrics()
+    if errors is None:
+        errors = []
+    store = open_verb_store(json_folder, io_threads=io_threads)
+    ids = default_service()
+    shards = ShardMap.open(json_folder)
+
+    def unreadable(file, where, error):
+        errors.append(SchemaError(file, where, UNREADABLE, str(error)))
+        print(f"  Skipping {file} {where}".rstrip() + ": unreadable")
+
+    verbs = []
+    added = 0
+    moved = 0
+    for infinitive, data in metrics.timed_iter("load", store.iter_verbs(on_error=unreadable)):
+        with metrics.stage("validate"):
+            verb_errors = VERB_VALIDATOR.validate(data, str(store.source_of(infinitive)))
+        if verb_errors:
+            errors.extend(verb_errors)
+            if any(e.fatal for e in verb_errors):
+                print(f"  Skipping {infinitive}: fatal validation errors")
+                if shards is not None:
+                    shards.deck_for(VERB_GROUP, infinitive)  # keeps its deck until it is fixed
+                continue
+        with metrics.stage("guids"):
+            # Looked up for every verb so the whole corpus is checked for collisions
+            note_id = ids.get(data["infinitive"])
+            if not data.get("note_guid"):
+                data["note_guid"] = note_id
+                store.put(infinitive, data)
+                print(f"  Added note_guid to {data['infinitive']}")
+                added += 1
+        if shards is not None:
+            with metrics.stage("shards"):
+                deck_name, deck_guid = shards.deck_for(VERB_GROUP, infinitive)
+                if data.get("deck_name") != deck_name or str(data.get("deck_guid")) != deck_guid:
+                    data["deck_name"] = deck_name
+                    data["deck_guid"] = deck_guid
+                    store.put(infinitive, data)
+                    print(f"  Assigned {infinitive} to deck {deck_name}")
+                    moved += 1
+        with metrics.stage("extract_fields"):
+            verbs.append(verb_record(data))
+    print(f"Found {len(verbs)} verbs in {json_folder}")
+    metrics.count("verbs", len(verbs))
+
+    with metrics.stage("guids"):
+        ids.report_collisions()
+    metrics.count("guids_updated", added)
+    updated = added
+    if shards is not None:
+        with metrics.stage("shards"):
+            shards.prune()
+            shards.save()
+        metrics.count("decks_assigned", moved)
+        updated += moved
+
     if updated:
-        print(f"  Assigned {updated} new note GUIDs")
-    return updated
+        with metrics.stage("save_store"):
+            store.save()
+        print(f"  Saved {updated} GUID/deck updates")
+    return verbs
 
 
 def extract_fields(verb_data: dict) -> list[str]:
@@ -167,46 +341,67 @@ def extract_fields(verb_data: dict) -> list[str]:
     return fields
 
 
-def create_decks_from_folder(json_folder: str, output_folder: str = "."):
+def plan_verb_decks(json_folder: str, output_folder: str = ".", models: tuple = None,
+                    force: bool = False, level: str = "A1", metrics: BuildMetrics = None,
+                    io_threads: int = DEFAULT_IO_THREADS, include_current: bool = False,
+                    settings=None, errors: list = None):
     """
-    Load all JSON verb files, validate, group by deck_guid,
-    and create Anki decks.
+    Load all JSON verb files, group by deck_guid, and plan a
+    deck for every deck whose content hash differs from the build
+    manifest (or all of them when `force` is set). Nothing is written yet.
+    `models` is an optional (regular, irregular) pair of prebuilt models,
+    and `settings` the deck_packaging.package_settings() they will be
+    written with. Validation errors are appended to `errors` (see
+    load_verb_corpus). Returns (created_decks, pending).
     """
-    # Step 1: Ensure all verbs have GUIDs (separate from generation)
-    ensure_verb_guids(json_folder)
-
-    # Step 2: Load and validate
-    verbs = load_json_files(json_folder)
-    if not verbs:
+    if metrics is None:
+        metrics = BuildMetrics()
+    if errors is None:
+        errors = []
+
+    # Step 1: Load and validate every verb once, assigning any missing note GUIDs
+    verbs = load_verb_corpus(json_folder, metrics=metrics, io_threads=io_threads, errors=errors)
+    if not verbs and not errors:
         raise ValueError("No JSON verb files found in folder.")
 
-    all_errors = []
-    for verb_data in verbs:
-        errors = validate_verb_data(verb_data)
-        all_errors.extend(errors)
-
-    if all_errors:
-        print(f"\n=== VALIDATION ERRORS ({len(all_errors)}) ===")
-        for err in all_errors:
-            print(f"  {err}")
-        print()
+    return plan_verb_groups(verbs, output_folder, models=models, force=force, level=level,
+                            metrics=metrics, include_current=include_current, settings=settings)
 
-    # Step 3: Build models (deterministic, not data-dependent)
-    model = get_italian_verb_model(irregular=False)
-    irregular_model = get_italian_verb_model(irregular=True)
-    expected_field_count = len(model.fields)
 
-    # Step 4: Group by deck_guid
+def plan_verb_groups(verbs: list, output_folder: str = ".", models: tuple = None,
+                     force: bool = False, level: str = "A1", metrics: BuildMetrics = None,
+                     include_current: bool = False, settings=None):
+    """
+    Steps 2-4 of plan_verb_decks for verbs that are already loaded (as
+    VerbRecords). Every deck is planned from the verbs given, so pass all
+    of a deck's verbs.
+    With `include_current`, up-to-date decks are planned too (marked
+    `current`, see build_all --package). Returns (created_decks, pending).
+    """
+    if metrics is None:
+        metrics = BuildMetrics()
+
+    # Step 2: Build models (deterministic, not data-dependent)
+    if models is None:
+        with metrics.stage("model_build"):
+            models = (get_italian_verb_model(irregular=False), get_italian_verb_model(irregular=True))
+    model, irregular_model = models
+    expected_field_count = len(VERB_FIELD_NAMES)
+    positions = model_field_positions(model)
+    model_hashes = {
+        model.model_id: model_digest(model),
+        irregular_model.model_id: model_digest(irregular_model),
+    }
+
+    # Step 3: Group by deck_guid
     deck_groups = {}
     verbs_without_guid = []
 
-    for verb_data in verbs:
-        deck_guid = verb_data.get("deck_guid")
-        if deck_guid:
-            deck_guid = str(deck_guid)
-            deck_groups.setdefault(deck_guid, []).append(verb_data)
+    for verb in verbs:
+        if verb.deck_guid:
+            deck_groups.setdefault(str(verb.deck_guid), []).append(verb)
         else:
-            verbs_without_guid.append(verb_data["infinitive"])
+            verbs_without_guid.append(verb.infinitive)
 
     if verbs_without_guid:
         print(f"Warning: {len(verbs_without_guid)} verbs without deck_guid:")
@@ -216,9 +411,11 @@ def create_decks_from_folder(json_folder: str, output_folder: str = "."):
     print(f"Found {len(deck_groups)} unique deck GUIDs")
     print(f"Total verbs with deck_guid: {sum(len(g) for g in deck_groups.values())}")
 
-    # Step 5: Create decks
+    # Step 4: Create decks
     os.makedirs(output_folder, exist_ok=True)
+    manifest = BuildManifest(output_folder)
     created_decks = []
+    pending = []
 
     for deck_guid, verb_group in deck_groups.items():
         if not verb_group:
@@ -226,59 +423,117 @@ def create_decks_from_folder(json_folder: str, output_folder: str = "."):
 
         print(f"\nProcessing deck {deck_guid} with {len(verb_group)} verbs:")
 
-        deck_name = verb_group[0].get("deck_name")
+        deck_name = verb_group[0].deck_name
         if not deck_name:
-            verb_names = sorted([v["infinitive"] for v in verb_group])
-            deck_name = f"Italian::A1::Verbs::{verb_names[0]}_{verb_names[-1]}"
+            verb_names = sorted([v.infinitive for v in verb_group])
+            deck_name = f"Italian::{level}::Verbs::{verb_names[0]}_{verb_names[-1]}"
             print(f"    Warning: Using fallback deck name: {deck_name}")
 
-        verb_names = sorted([v["infinitive"] for v in verb_group])
+        verb_names = sorted([v.infinitive for v in verb_group])
         first_verb = verb_names[0]
         last_verb = verb_names[-1]
 
-        deck = genanki.Deck(deck_id=int(deck_guid), name=deck_name)
-        notes_added = 0
-
-        for verb_data in verb_group:
-            print(f"  Processing {verb_data['infinitive']}")
-
-            fields = extract_fields(verb_data)
+        notes = []
+        for verb in verb_group:
+            print(f"  Processing {verb.infinitive}")
 
+            fields = verb.fields
             if len(fields) != expected_field_count:
-                print(f"    ERROR: Field count mismatch for '{verb_data['infinitive']}':")
+                print(f"    ERROR: Field count mismatch for '{verb.infinitive}':")
                 print(f"      Expected: {expected_field_count}, Actual: {len(fields)}")
-                print(f"      Skipping verb '{verb_data['infinitive']}'")
+                print(f"      Skipping verb '{verb.infinitive}'")
                 continue
+            if positions is not None:
+                fields = tuple(fields[i] for i in positions)
 
-            note_guid = verb_data.get("note_guid")
-            model_to_use = model if verb_data["regular"] else irregular_model
+            model_to_use = model if verb.regular else irregular_model
+            notes.append((verb.note_guid, model_to_use, fields))
 
-            note = genanki.Note(guid=note_guid, model=model_to_use, fields=fields)
-            deck.add_note(note)
-            notes_added += 1
+        if not notes:
+            print(f"  Skipping deck {deck_guid} - no valid verbs")
+            continue
 
-        if notes_added > 0:
-            output_filename = f"A1_Verbs_{first_verb}_{last_verb}.apkg"
-            genanki.Package(deck).write_to_file(
-                os.path.join(output_folder, output_filename)
+        output_filename = f"{level}_Verbs_{first_verb}_{last_verb}.apkg"
+        info = {
+            "deck_guid": deck_guid,
+            "deck_name": deck_name,
+            "filename": output_filename,
+            "verb_count": len(notes),
+            "first_verb": first_verb,
+            "last_verb": last_verb,
+        }
+
+        metrics.count("decks")
+        metrics.count("notes", len(notes))
+        with metrics.stage("manifest"):
+            manifest.track(deck_guid, output_filename)
+            digest = deck_digest(
+                int(deck_guid), deck_name,
+                ((g, model_hashes[m.model_id], f) for g, m, f in notes), settings,
             )
-            print(f"  Created {output_filename} with {notes_added} verbs")
-            print(f"  Deck name: {deck_name}")
-            created_decks.append({
-                "deck_guid": deck_guid,
-                "deck_name": deck_name,
-                "filename": output_filename,
-                "verb_count": notes_added,
-                "first_verb": first_verb,
-                "last_verb": last_verb,
-            })
-        else:
-            print(f"  Skipping deck {deck_guid} - no valid verbs")
+            current = not force and manifest.is_current(output_filename, digest)
+        if current:
+            print(f"  Unchanged {output_filename} with {len(notes)} verbs")
+            created_decks.append({**info, "written": False})
+            if not include_current:
+                continue
+
+        with metrics.stage("notes"):
+            deck = PlannedDeck(int(deck_guid), deck_name, notes)
+        output_path = os.path.join(output_folder, output_filename)
+        if current:
+            pending.append(PendingPackage(deck, output_path, manifest, digest, info, current=True))
+            continue
+        metrics.count("decks_written")
+
+        info["written"] = True
+        created_decks.append(info)
+        pending.append(PendingPackage(deck, output_path, manifest, digest, info))
+
+    manifest.save()  # deck files seen for the first time
+    return created_decks, pending
+
+
+def report_created(pending: list):
+    """Print the lines for each deck written from `pending`."""
+    for p in pending:
+        print(f"  Created {p.info['filename']} with {p.info['verb_count']} verbs")
+        print(f"  Deck name: {p.info['deck_name']}")
+
+
+def create_decks_from_folder(json_folder: str, output_folder: str = ".", force: bool = False,
+                             jobs: int = 1, level: str = "A1", reproducible: bool = False,
+                             metrics: BuildMetrics = None, strict: bool = False,
+                             io_threads: int = DEFAULT_IO_THREADS, writer: str = DEFAULT_WRITER):
+    """
+    Load all JSON verb files, validate, group by deck_guid,
+    and create Anki decks. Decks whose content hash matches the build
+    manifest are skipped unless `force` is set. Packaging uses `jobs`
+    worker processes, and `reproducible` makes identical input give
+    byte-identical packages. Verbs with fatal validation errors are left
+    out. With `strict` the folder is validated first (by `jobs` workers)
+    and a fatal error raises ValidationFailed before any verb file is written.
+    """
+    if metrics is None:
+        metrics = BuildMetrics()
+    if strict:
+        run_validation(verb_sources=[json_folder], jobs=jobs, strict=True, metrics=metrics)
+    errors = []
+    created_decks, pending = plan_verb_decks(json_folder, output_folder, force=force, level=level,
+                                             metrics=metrics, io_threads=io_threads,
+                                             settings=package_settings(reproducible, writer),
+                                             errors=errors)
+    finish_validation(errors, strict=strict, metrics=metrics)
+    with metrics.stage("package"):
+        write_pending(pending, n_jobs=jobs, reproducible=reproducible, writer=writer)
+    report_created(pending)
 
     print(f"\n=== SUMMARY ===")
-    print(f"Created {len(created_decks)} deck files:")
+    written = [info for info in created_decks if info["written"]]
+    print(f"Created {len(written)} deck files ({len(created_decks) - len(written)} unchanged):")
     for info in created_decks:
-        print(f"  {info['filename']} (GUID: {info['deck_guid']}, {info['verb_count']} verbs)")
+        status = "" if info["written"] else " [unchanged]"
+        print(f"  {info['filename']} (GUID: {info['deck_guid']}, {info['verb_count']} verbs){status}")
         print(f"    Deck name: {info['deck_name']}")
 
     return created_decks
@@ -294,14 +549,42 @@ def load_config():
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate Anki verb decks")
     parser.add_argument("--level", default="A1", help="CEFR level (default: A1)")
-    parser.add_argument("--source", help="Override source folder path")
+    parser.add_argument("--source", help="Override source folder (or .jsonl verb store) path")
     parser.add_argument("--output", help="Override output folder path")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild every deck, ignoring the build manifest")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Worker processes for packaging and --strict validation "
+                             "(0 = one per CPU, default: 1)")
+    parser.add_argument("--io-threads", type=int, default=DEFAULT_IO_THREADS,
+                        help=f"Concurrent verb file reads (1 = one at a time, default: {DEFAULT_IO_THREADS})")
+    parser.add_argument("--strict", action="store_true",
+                        help="Abort before building any deck if validation finds fatal errors")
+    parser.add_argument("--reproducible", action="store_true",
+                        help="Byte-identical output for identical input (fixed epoch, zip metadata)")
+    parser.add_argument("--writer", choices=PACKAGE_WRITERS, default=DEFAULT_WRITER,
+                        help=f"Package writer: genanki objects or direct sqlite inserts (default: {DEFAULT_WRITER})")
+    parser.add_argument("--report", help="Write a JSON timing/counter report to this path")
+    parser.add_argument("--profile", action="store_true",
+                        help="Also capture cProfile (.prof next to the report) and tracemalloc stats")
     args = parser.parse_args()
 
+    metrics = BuildMetrics()
+    if args.profile:
+        metrics.start_profiling()
+
     config = load_config()
     level_config = config["levels"].get(args.level, {}).get("verbs", {})
 
     json_folder = args.source or level_config.get("source", "SourceData/A1/Verbs/CardSource")
     output_folder = args.output or level_config.get("output", "Decks/A1/Verbs")
 
-    create_decks_from_folder(json_folder, output_folder)
+    try:
+        create_decks_from_folder(json_folder, output_folder, force=args.force, jobs=args.jobs,
+                                 level=args.level, reproducible=args.reproducible, metrics=metrics,
+                                 strict=args.strict, io_threads=args.io_threads,
+                                 writer=args.writer)
+    except ValidationFailed as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    metrics.finish(args.report, profile=args.profile)
@@ -3,17 +3,35 @@
 # GenerateVocabDeck.py
 # Reads A1 vocabulary data from CSV, assigns stable GUIDs for decks and notes,
 # updates the CSV in-place, and generates Anki .apkg decks grouped by category.
+# Rows are validated as they are streamed; rows with fatal errors are left out.
 
 import argparse
 import csv
 import json
 import os
+import sys
 from pathlib import Path
+from typing import NamedTuple
 
 import genanki
 
-from helpers import stable_id, load_csv, save_csv
-from schemas import VOCAB_MODEL_FIELDS, VOCAB_MODEL_SEED, validate_vocab_row
+from build_manifest import BuildManifest, deck_digest, model_digest
+from deck_packaging import (
+    DEFAULT_WRITER,
+    PACKAGE_WRITERS,
+    PendingPackage,
+    PlannedDeck,
+    package_settings,
+    write_pending,
+)
+from helpers import atomic_open, stable_id
+from id_service import IdService, default_service
+from instrumentation import BuildMetrics
+from model_cache import get_model
+from schema_validator import UNREADABLE, VOCAB_VALIDATOR, SchemaError
+from schemas import VOCAB_MODEL_FIELDS, VOCAB_MODEL_SEED
+from sharding import ShardMap
+from source_validation import ValidationFailed, finish_validation, run_validation
 
 TEMPLATE_DIR = Path(__file__).parent / "templates" / "vocab"
 
@@ -23,6 +41,15 @@ def _read_template(name: str) -> str:
 
 
 def build_vocab_model() -> genanki.Model:
+    """
+    Return the vocab genanki Model, rebuilding it only when the vocab
+    templates or model fields have changed (see model_cache).
+    """
+    params = {"fields": VOCAB_MODEL_FIELDS, "seed": VOCAB_MODEL_SEED}
+    return get_model("vocab", TEMPLATE_DIR, params, _build_vocab_model)
+
+
+def _build_vocab_model() -> genanki.Model:
     """
     Build a genanki Model for Italian A1 vocabulary with two templates:
       - En->It  (front: English, back: everything else)
@@ -55,124 +82,315 @@ def build_vocab_model() -> genanki.Model:
     )
 
 
-def load_vocab_csv(csv_path: str) -> list[dict]:
-    """Read the vocab CSV using DictReader and return a list of row dicts."""
-    with open(csv_path, "r", encoding="utf-8") as f:
-        content = f.read().replace("\r\n", "\n").replace("\r", "\n")
-    reader = csv.DictReader(content.strip().split("\n"))
-    # Strip whitespace from header names so keys like "Italian   " become "Italian"
-    reader.fieldnames = [name.strip() for name in reader.fieldnames]
-    return list(reader)
+def read_vocab_header(csv_path: str) -> list[str]:
+    """Return the CSV header with whitespace stripped from each column name."""
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        header = next(csv.reader(f), [])
+    return [name.strip() for name in header]
 
 
-def ensure_guids(rows: list[dict]) -> int:
+def iter_vocab_rows(csv_path: str):
     """
-    For every row dict, ensure Deck Name, Deck GUID, and Note GUID are populated.
-    Modifies rows in-place and returns the number of rows updated.
+    Stream the vocab CSV one row dict at a time.
+    Opened with newline="" so quoted fields may contain embedded newlines.
     """
-    updated = 0
-    for row in rows:
-        italian = row.get("Italian", "").strip()
-        category = row.get("Category", "").strip()
-
-        if not italian or not category:
-            continue
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        # Strip whitespace from header names so keys like "Italian   " become "Italian"
+        reader.fieldnames = [name.strip() for name in reader.fieldnames or []]
+        for row in reader:
+            if not any((value or "").strip() for value in row.values()):
+                continue
+            yield row
 
-        deck_name = f"Italian::A1::Vocab::{category}"
-        deck_guid = str(stable_id(deck_name))
-        note_guid = str(stable_id(italian))
 
-        changed = False
-        if row.get("Deck Name", "").strip() != deck_name:
-            row["Deck Name"] = deck_name
-            changed = True
-        if row.get("Deck GUID", "").strip() != deck_guid:
-            row["Deck GUID"] = deck_guid
-            changed = True
-        if not row.get("Note GUID", "").strip():
-            row["Note GUID"] = note_guid
-            changed = True
+def load_vocab_csv(csv_path: str) -> list[dict]:
+    """Read the vocab CSV using DictReader and return a list of row dicts."""
+    return list(iter_vocab_rows(csv_path))
 
-        if changed:
-            updated += 1
 
+def ensure_row_guids(row: dict, level: str = "A1", ids: IdService = None,
+                     shards: ShardMap = None) -> bool:
+    """
+    Ensure Deck Name, Deck GUID, and Note GUID are populated on one row dict.
+    Modifies the row in-place and returns True if anything changed.
+    IDs come from `ids` (default: the shared memoized IdService). With a
+    shard map the deck comes from it instead of straight from the category.
+    """
+    if ids is None:
+        ids = default_service()
+    italian = row.get("Italian", "").strip()
+    category = row.get("Category", "").strip()
+
+    if not italian or not category:
+        return False
+
+    if shards is not None:
+        deck_name, deck_guid = shards.deck_for(category, italian)
+    else:
+        deck_name = f"Italian::{level}::Vocab::{category}"
+        deck_guid = str(ids.get(deck_name))
+    note_guid = str(ids.get(italian))
+
+    changed = False
+    if row.get("Deck Name", "").strip() != deck_name:
+        row["Deck Name"] = deck_name
+        changed = True
+    if row.get("Deck GUID", "").strip() != deck_guid:
+        row["Deck GUID"] = deck_guid
+        changed = True
+    if not row.get("Note GUID", "").strip():
+        row["Note GUID"] = note_guid
+        changed = True
+
+    return changed
+
+
+def ensure_guids(rows, level: str = "A1", ids: IdService = None) -> int:
+    """
+    For every row dict, ensure Deck Name, Deck GUID, and Note GUID are populated.
+    Modifies rows in-place and returns the number of rows updated.
+    """
+    if ids is None:
+        ids = default_service()
+    updated = sum(1 for row in rows if ensure_row_guids(row, level, ids))
+    ids.report_collisions()
     return updated
 
 
-def save_vocab_csv(csv_path: str, rows: list[dict], fieldnames: list[str]):
-    """Write row dicts back to CSV."""
-    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+def save_vocab_csv(csv_path: str, rows, fieldnames: list[str]):
+    """Write row dicts back to CSV via a temp file and an atomic rename."""
+    with atomic_open(csv_path, newline="") as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(rows)
 
 
-def generate_decks(rows: list[dict], output_folder: str):
+def vocab_note_fields(row: dict) -> tuple:
+    """Return the VOCAB_MODEL_FIELDS values for one CSV row."""
+    return (
+        row.get("Italian", "").strip(),
+        row.get("English", "").strip(),
+        row.get("Part of Speech", "").strip(),
+        row.get("IPA Pronunciation", "").strip(),
+        row.get("Gender", "").strip(),
+        row.get("Context", "").strip(),
+        row.get("Synonyms", "").strip(),
+        row.get("Example Sentence", "").strip(),
+        row.get("Example Sentence English", "").strip(),
+        row.get("Category", "").strip(),
+    )
+
+
+class VocabRecord(NamedTuple):
+    """One vocab note: its deck, its GUIDs and its VOCAB_MODEL_FIELDS values."""
+    deck_name: str
+    deck_guid: int
+    note_guid: int
+    fields: tuple
+
+
+def vocab_records(rows, metrics: BuildMetrics = None):
     """
-    Group rows by deck name, create one .apkg per deck.
+    Turn row dicts (any iterable, consumed once) into VocabRecords, skipping
+    rows that have no deck. Each row dict can be dropped once it is converted.
     """
-    model = build_vocab_model()
-
-    # Validate all rows up front
-    all_errors = []
+    if metrics is None:
+        metrics = BuildMetrics()
     for row in rows:
-        errors = validate_vocab_row(row)
-        all_errors.extend(errors)
+        metrics.count("rows")
+        deck_name = row.get("Deck Name", "").strip()
+        if deck_name:
+            yield VocabRecord(deck_name, int(row["Deck GUID"].strip()), int(row["Note GUID"].strip()),
+                              vocab_note_fields(row))
 
-    if all_errors:
-        print(f"\n=== VALIDATION ERRORS ({len(all_errors)}) ===")
-        for err in all_errors:
-            print(f"  {err}")
-        print()
 
-    # Group by deck name
+def plan_decks(records, output_folder: str, model: genanki.Model = None,
+               force: bool = False, level: str = "A1", metrics: BuildMetrics = None,
+               include_current: bool = False, settings=None):
+    """
+    Group VocabRecords (any iterable, consumed once) by
+    deck name and plan a deck for every
+    deck whose content hash differs from the build manifest (or all of them
+    when `force` is set). Nothing is written yet.
+    Returns (created, pending): summary entries for every deck, and a
+    PendingPackage for each deck that needs writing. With `include_current`,
+    up-to-date decks are planned too (marked `current`, see build_all --package).
+    `settings` is the deck_packaging.package_settings() they will be written with.
+    """
+    if metrics is None:
+        metrics = BuildMetrics()
+    if model is None:
+        with metrics.stage("model_build"):
+            model = build_vocab_model()
+    model_hash = model_digest(model)
+
+    # Group in a single pass so `records` may be a lazy stream (validation
+    # runs beforehand, see source_validation).
     deck_groups = {}
-    for row in rows:
-        deck_name = row.get("Deck Name", "").strip()
-        if not deck_name:
-            continue
-        deck_groups.setdefault(deck_name, []).append(row)
+    for record in records:
+        with metrics.stage("notes"):
+            group = deck_groups.get(record.deck_name)
+            if group is None:
+                group = deck_groups[record.deck_name] = (record.deck_guid, [])
+            group[1].append((record.note_guid, record.fields))
 
     os.makedirs(output_folder, exist_ok=True)
+    manifest = BuildManifest(output_folder)
 
     created = []
-    for deck_name, group in sorted(deck_groups.items()):
-        deck_guid = int(group[0]["Deck GUID"].strip())
-        deck = genanki.Deck(deck_id=deck_guid, name=deck_name)
-
-        notes_added = 0
-        for row in group:
-            note_guid = int(row["Note GUID"].strip())
-            fields = [
-                row.get("Italian", "").strip(),
-                row.get("English", "").strip(),
-                row.get("Part of Speech", "").strip(),
-                row.get("IPA Pronunciation", "").strip(),
-                row.get("Gender", "").strip(),
-                row.get("Context", "").strip(),
-                row.get("Synonyms", "").strip(),
-                row.get("Example Sentence", "").strip(),
-                row.get("Example Sentence English", "").strip(),
-                row.get("Category", "").strip(),
-            ]
-
-            note = genanki.Note(guid=note_guid, model=model, fields=fields)
-            deck.add_note(note)
-            notes_added += 1
-
+    pending = []
+    for deck_name, (deck_guid, notes) in sorted(deck_groups.items()):
         # Derive filename from category
         category = deck_name.split("::")[-1]
         safe_category = category.replace(" ", "_").replace("&", "and")
-        output_filename = f"A1_Vocab_{safe_category}.apkg"
+        output_filename = f"{level}_Vocab_{safe_category}.apkg"
         output_path = os.path.join(output_folder, output_filename)
 
-        genanki.Package(deck).write_to_file(output_path)
-        print(f"  Created {output_filename} ({notes_added} notes, deck: {deck_name})")
-        created.append({"filename": output_filename, "deck_name": deck_name, "count": notes_added})
+        metrics.count("decks")
+        metrics.count("notes", len(notes))
+        with metrics.stage("manifest"):
+            manifest.track(deck_guid, output_filename)
+            digest = deck_digest(deck_guid, deck_name, ((g, model_hash, f) for g, f in notes), settings)
+            current = not force and manifest.is_current(output_filename, digest)
+        info = {"filename": output_filename, "deck_name": deck_name, "count": len(notes)}
+        if current:
+            print(f"  Unchanged {output_filename} ({len(notes)} notes, deck: {deck_name})")
+            created.append({**info, "written": False})
+            if not include_current:
+                continue
+
+        with metrics.stage("notes"):
+            deck = PlannedDeck(deck_guid, deck_name, [(note_guid, model, fields) for note_guid, fields in notes])
+        if current:
+            pending.append(PendingPackage(deck, output_path, manifest, digest, info, current=True))
+            continue
+        metrics.count("decks_written")
+
+        info["written"] = True
+        created.append(info)
+        pending.append(PendingPackage(deck, output_path, manifest, digest, info))
 
+    manifest.save()  # deck files seen for the first time
+    return created, pending
+
+
+def report_created(pending: list):
+    """Print one line per deck written from `pending`."""
+    for p in pending:
+        info = p.info
+        print(f"  Created {info['filename']} ({info['count']} notes, deck: {info['deck_name']})")
+
+
+def generate_decks(records, output_folder: str, force: bool = False, jobs: int = 1,
+                   level: str = "A1", model: genanki.Model = None, reproducible: bool = False,
+                   metrics: BuildMetrics = None, writer: str = DEFAULT_WRITER,
+                   strict: bool = False, errors: list = None):
+    """
+    Group VocabRecords by deck name, create one .apkg per deck.
+    Decks whose content hash matches the build manifest are skipped unless
+    `force` is set. Packages are written by `jobs` worker processes with
+    `writer`, and `reproducible` makes identical input give byte-identical packages.
+    `errors` is the list stream_vocab_records() appends to; it is reported
+    once the records are planned. `strict` means the CSV already passed
+    run_validation (see source_validation.finish_validation).
+    """
+    if metrics is None:
+        metrics = BuildMetrics()
+    created, pending = plan_decks(records, output_folder, model=model, force=force, level=level,
+                                  metrics=metrics, settings=package_settings(reproducible, writer))
+    finish_validation(errors or [], strict=strict, metrics=metrics)
+    with metrics.stage("package"):
+        write_pending(pending, n_jobs=jobs, reproducible=reproducible, writer=writer)
+    report_created(pending)
     return created
 
 
+def stream_vocab_rows(csv_path: str, level: str = "A1", stats: dict = None,
+                      metrics: BuildMetrics = None, errors: list = None):
+    """
+    Lazily read the vocab CSV, validate each row, fill in missing GUIDs and
+    yield it. SchemaErrors are appended to `errors`; rows with fatal errors
+    are skipped, and nothing is yielded if the file can't be read or its
+    header lacks a required column.
+    The number of rows updated is stored in stats["updated"]. Once the
+    stream is exhausted the CSV is saved, but only if some row changed.
+    Decks come from the CSV's shard map when it has one (see sharding.py).
+    """
+    if stats is None:
+        stats = {}
+    if metrics is None:
+        metrics = BuildMetrics()
+    if errors is None:
+        errors = []
+    stats["updated"] = 0
+    try:
+        header_errors = VOCAB_VALIDATOR.validate_header(read_vocab_header(csv_path), str(csv_path))
+    except OSError as e:
+        errors.append(SchemaError(str(csv_path), "", UNREADABLE, str(e)))
+        print(f"  Skipping {csv_path}: unreadable")
+        return
+    errors.extend(header_errors)
+    if any(e.fatal for e in header_errors):
+        print(f"  Skipping {csv_path}: fatal validation errors in the header")
+        return
+    ids = default_service()
+    shards = ShardMap.open(csv_path)
+
+    for index, row in enumerate(metrics.timed_iter("load", iter_vocab_rows(csv_path)), 1):
+        with metrics.stage("validate"):
+            row_errors = VOCAB_VALIDATOR.validate_row(row, index, str(csv_path))
+        if row_errors:
+            errors.extend(row_errors)
+            if any(e.fatal for e in row_errors):
+                italian = (row.get("Italian") or "").strip()
+                category = (row.get("Category") or "").strip()
+                print(f"  Skipping row {index} ({italian}): fatal validation errors")
+                if shards is not None and italian and category:
+                    shards.deck_for(category, italian)  # keeps its deck until it is fixed
+                continue
+        with metrics.stage("guids"):
+            if ensure_row_guids(row, level, ids, shards):
+                stats["updated"] += 1
+        yield row
+
+    metrics.count("guids_updated", stats["updated"])
+    ids.report_collisions()
+    if shards is not None:
+        shards.prune()
+        shards.save()
+    if stats["updated"]:
+        with metrics.stage("save_csv"):
+            rewrite_vocab_csv(csv_path, level, shards)
+        print(f"  Saved {stats['updated']} GUID updates to {csv_path}")
+
+
+def stream_vocab_records(csv_path: str, level: str = "A1", stats: dict = None,
+                         metrics: BuildMetrics = None, errors: list = None):
+    """stream_vocab_rows() as VocabRecords, for the planning stage."""
+    return vocab_records(stream_vocab_rows(csv_path, level=level, stats=stats, metrics=metrics,
+                                           errors=errors),
+                         metrics=metrics)
+
+
+def rewrite_vocab_csv(csv_path: str, level: str = "A1", shards: ShardMap = None):
+    """
+    Re-stream the CSV with GUIDs filled in and atomically replace it.
+    Only called when something changed, so the common no-op build never
+    touches the source file. Rows with fatal validation errors are written
+    back as they are.
+    """
+    ids = default_service()
+
+    def stamped_rows():
+        for row in iter_vocab_rows(csv_path):
+            if not any(e.fatal for e in VOCAB_VALIDATOR.validate_row(row, 0)):
+                ensure_row_guids(row, level, ids, shards)
+            yield row
+
+    save_vocab_csv(csv_path, stamped_rows(), read_vocab_header(csv_path))
+
+
 def load_config():
     """Load paths from config.json."""
     config_path = Path(__file__).parent / "config.json"
@@ -185,36 +403,63 @@ def main():
     parser.add_argument("--level", default="A1", help="CEFR level (default: A1)")
     parser.add_argument("--source", help="Override source CSV path")
     parser.add_argument("--output", help="Override output folder path")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild every deck, ignoring the build manifest")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Worker processes for packaging and --strict validation "
+                             "(0 = one per CPU, default: 1)")
+    parser.add_argument("--strict", action="store_true",
+                        help="Abort before building any deck if validation finds fatal errors")
+    parser.add_argument("--reproducible", action="store_true",
+                        help="Byte-identical output for identical input (fixed epoch, zip metadata)")
+    parser.add_argument("--writer", choices=PACKAGE_WRITERS, default=DEFAULT_WRITER,
+                        help=f"Package writer: genanki objects or direct sqlite inserts (default: {DEFAULT_WRITER})")
+    parser.add_argument("--report", help="Write a JSON timing/counter report to this path")
+    parser.add_argument("--profile", action="store_true",
+                        help="Also capture cProfile (.prof next to the report) and tracemalloc stats")
     args = parser.parse_args()
 
+    metrics = BuildMetrics()
+    if args.profile:
+        metrics.start_profiling()
+
     config = load_config()
     level_config = config["levels"].get(args.level, {}).get("vocab", {})
 
     csv_path = args.source or level_config.get("source", "SourceData/A1/Vocab/CardSource/A1_Vocab.csv")
     output_folder = args.output or level_config.get("output", "Decks/A1/Vocab")
 
-    print("Loading CSV...")
-    rows = load_vocab_csv(csv_path)
-    fieldnames = list(rows[0].keys()) if rows else []
-
-    print("Ensuring GUIDs...")
-    updated = ensure_guids(rows)
-    print(f"  Updated {updated} rows with deck/note GUIDs.")
-
-    print("Saving CSV...")
-    save_vocab_csv(csv_path, rows, fieldnames)
-
-    print("Generating Anki decks...")
-    created = generate_decks(rows, output_folder)
-
+    try:
+        if args.strict:
+            print("Validating CSV...")
+            run_validation(vocab_sources=[csv_path], jobs=args.jobs, strict=True, metrics=metrics)
+
+        print("Streaming CSV, validating and ensuring GUIDs...")
+        stats = {}
+        errors = []
+        records = stream_vocab_records(csv_path, level=args.level, stats=stats, metrics=metrics, errors=errors)
+
+        print("Generating Anki decks...")
+        created = generate_decks(records, output_folder, force=args.force, jobs=args.jobs,
+                                 level=args.level, reproducible=args.reproducible, metrics=metrics,
+                                 writer=args.writer, strict=args.strict, errors=errors)
+    except ValidationFailed as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"  Updated {stats['updated']} rows with deck/note GUIDs.")
+
+    written = [d for d in created if d["written"]]
     print(f"\n=== SUMMARY ===")
-    print(f"Created {len(created)} deck files:")
+    print(f"Created {len(written)} deck files ({len(created) - len(written)} unchanged):")
     total_notes = 0
     for d in created:
-        print(f"  {d['filename']} - {d['count']} notes ({d['deck_name']})")
+        status = "" if d["written"] else " [unchanged]"
+        print(f"  {d['filename']} - {d['count']} notes ({d['deck_name']}){status}")
         total_notes += d["count"]
     print(f"Total notes: {total_notes}")
 
+    metrics.finish(args.report, profile=args.profile)
+
 
 if __name__ == "__main__":
     main()
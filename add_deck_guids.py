@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 """
 Script to add deck_guid entries to verb JSON files based on verb_deck_mapping.csv
+
+A verb source with a ProcessData/deck_shards.json file has its decks
+assigned automatically on every build instead (see sharding.py), so the
+script refuses to run on it: the mapping written here would be replaced by
+the shard map's assignment.
 """
 
+import argparse
 import csv
-import json
 import os
 from pathlib import Path
 
+from change_set import TrackedStore, add_change_set_arguments, apply_saved_changes, finish
+from sharding import shards_path
+
 
 def load_verb_deck_mappings(csv_file_path):
     """
@@ -47,32 +55,33 @@ def update_verb_json_files(mappings, verb_dir):
 
     Args:
         mappings: Dictionary mapping verb_infinitive to deck_guid
-        verb_dir: Path to directory containing individual verb JSON files
+        verb_dir: Path to directory containing individual verb JSON files,
+            or to a .jsonl verb store
+
+    Returns:
+        TrackedStore: the edited verbs; nothing is written here
     """
     verb_path = Path(verb_dir)
 
     if not verb_path.exists():
         print(f"Error: Directory {verb_dir} does not exist")
-        return
+        return None
 
     updated_count = 0
     not_found_count = 0
     error_count = 0
 
-    # Get all JSON files in the directory
-    json_files = list(verb_path.glob("*.json"))
+    # Load every verb once from the folder or store
+    store = TrackedStore(verb_dir)
+    verbs = store.load()
 
-    for json_file in json_files:
+    for infinitive, verb_data in verbs.items():
         try:
-            # Load the JSON file
-            with open(json_file, 'r', encoding='utf-8') as f:
-                verb_data = json.load(f)
-
             # Get the verb infinitive from the JSON
             verb_infinitive = verb_data.get('infinitive')
 
             if not verb_infinitive:
-                print(f"Warning: No infinitive found in {json_file.name}")
+                print(f"Warning: No infinitive found in {store.source_of(infinitive).name}")
                 error_count += 1
                 continue
 
@@ -83,10 +92,7 @@ def update_verb_json_files(mappings, verb_dir):
                 # Add or update the deck_guid
                 verb_data['deck_guid'] = deck_guid
                 verb_data['deck_name'] = deck_name
-
-                # Write back to file
-                with open(json_file, 'w', encoding='utf-8') as f:
-                    json.dump(verb_data, f, ensure_ascii=False, indent=2)
+                store.mark_changed(infinitive)
 
                 print(f"Updated {verb_infinitive} with deck_guid {deck_guid}")
                 updated_count += 1
@@ -96,21 +102,41 @@ def update_verb_json_files(mappings, verb_dir):
                 not_found_count += 1
 
         except Exception as e:
-            print(f"Error processing {json_file.name}: {e}")
+            print(f"Error processing {store.source_of(infinitive).name}: {e}")
             error_count += 1
 
     print(f"\nSummary:")
     print(f"  Updated: {updated_count} files")
     print(f"  No mapping found: {not_found_count} files")
     print(f"  Errors: {error_count} files")
-    print(f"  Total processed: {len(json_files)} files")
+    print(f"  Total processed: {len(verbs)} files")
+    return store
 
 
 def main():
     """Main function to orchestrate the deck GUID addition process."""
+    parser = argparse.ArgumentParser(description="Add deck_guid/deck_name to the verb files")
+    parser.add_argument("--csv", default="SourceData/A1/Verbs/ProcessData/verb_deck_mapping.csv",
+                        help="Verb to deck mapping CSV")
+    parser.add_argument("--source", default="SourceData/A1/Verbs/CardSource",
+                        help="Verb folder or .jsonl store")
+    parser.add_argument("--verbose", action="store_true", help="List every change")
+    add_change_set_arguments(parser)
+    args = parser.parse_args()
+
+    shard_file = shards_path(args.source)
+    if shard_file.exists():
+        print(f"Error: {args.source} gets its decks from {shard_file} on every build, "
+              f"which would replace these mappings.")
+        print("Use 'python sharding.py show' to see the assignment instead.")
+        return
+
+    if apply_saved_changes(args):
+        return
+
     # File paths
-    csv_file_path = "SourceData/A1/Verbs/ProcessData/verb_deck_mapping.csv"
-    verb_dir = "SourceData/A1/Verbs"
+    csv_file_path = args.csv
+    verb_dir = args.source
 
     print("Adding deck GUIDs to verb JSON files...")
     print(f"CSV file: {csv_file_path}")
@@ -124,8 +150,11 @@ def main():
         print("No mappings loaded. Exiting.")
         return
 
-    # Update the verb JSON files
-    update_verb_json_files(mappings, verb_dir)
+    # Update the verb JSON files (in memory), then write only what changed
+    store = update_verb_json_files(mappings, verb_dir)
+    if store is None:
+        return
+    finish(store, args, verbose=args.verbose)
 
     print("\nDeck GUID addition complete!")
 
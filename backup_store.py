@@ -0,0 +1,215 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# backup_store.py
+# Content-addressed backups for helpers.backup_file. Each directory's
+# backup/ folder holds blobs named by the SHA-256 of their content plus a
+# manifest of file name -> [(time, hash), ...]. Identical content is stored
+# once, and backing up a file whose content matches its latest backup adds
+# nothing at all. prune() applies retention limits and deletes blobs no
+# version refers to any more.
+#
+# Usage:
+#   python backup_store.py list SourceData/A1/Verbs/CardSource [andare.json]
+#   python backup_store.py restore SourceData/A1/Verbs/CardSource andare.json [--version -2|[3]|3fa9c1]
+#   python backup_store.py prune SourceData/A1/Verbs/CardSource --keep-last 10 --max-age-days 90
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+from helpers import atomic_open
+
+BACKUP_DIRNAME = "backup"
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+class BackupStore:
+    """The backup/ folder next to a set of files."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.root = self.directory / BACKUP_DIRNAME
+        self.manifest_path = self.root / MANIFEST_FILENAME
+        self.files = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.files = data.get("files", {})
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        with atomic_open(self.manifest_path) as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, f, indent=1, sort_keys=True)
+        self.dirty = False
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / digest
+
+    def backup(self, file_path) -> str:
+        """Back up one file from this directory. Returns its content hash."""
+        file_path = Path(file_path)
+        content = file_path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+
+        versions = self.files.setdefault(file_path.name, [])
+        if versions and versions[-1]["hash"] == digest:
+            return digest
+
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_open(blob, "wb", encoding=None) as f:
+                f.write(content)
+        versions.append({"time": datetime.datetime.now().isoformat(timespec="seconds"),
+                         "hash": digest, "size": len(content)})
+        self.dirty = True
+        return digest
+
+    def find_version(self, name: str, version="-1") -> dict:
+        """
+        Pick a version of `name`: a list index as `list` prints it ("[0]",
+        "[-2]"; a bare negative number also works, -1 = latest), or a prefix
+        of its hash or timestamp. A bare non-negative number is a prefix,
+        since hashes and timestamps start with digits too.
+        """
+        versions = self.files.get(name)
+        if not versions:
+            raise KeyError(f"No backups of {name} in {self.root}")
+        index = re.fullmatch(r"\[(-?\d+)\]|(-\d+)", version)
+        if index:
+            try:
+                return versions[int(index.group(1) or index.group(2))]
+            except IndexError:
+                raise KeyError(f"{name} has only {len(versions)} backups")
+        matches = [v for v in versions if v["hash"].startswith(version) or v["time"].startswith(version)]
+        if len(matches) != 1:
+            raise KeyError(f"'{version}' matches {len(matches)} backups of {name}")
+        return matches[0]
+
+    def restore(self, name: str, version="-1", target=None) -> Path:
+        """
+        Write a backed-up version of `name` to `target` (default: the
+        original location). The current file is backed up first, so a
+        restore can itself be undone.
+        """
+        entry = self.find_version(name, version)
+        target = Path(target) if target else self.directory / name
+        if target.exists() and target.parent == self.directory:
+            self.backup(target)
+        content = self.blob_path(entry["hash"]).read_bytes()
+        with atomic_open(target, "wb", encoding=None) as f:
+            f.write(content)
+        self.save()
+        return target
+
+    def prune(self, keep_last: int = None, max_age_days: float = None) -> tuple[int, int]:
+        """
+        Drop versions beyond the newest `keep_last` per file and versions
+        older than `max_age_days` (the newest version of a file is always
+        kept), then delete unreferenced blobs. Returns (versions, blobs) removed.
+        """
+        if keep_last is not None and keep_last < 0:
+            raise ValueError(f"keep_last must be 0 or more, not {keep_last}")
+        cutoff = None
+        if max_age_days is not None:
+            cutoff = (datetime.datetime.now()
+                      - datetime.timedelta(days=max_age_days)).isoformat(timespec="seconds")
+
+        removed_versions = 0
+        for name, versions in list(self.files.items()):
+            kept = list(versions) if keep_last is None else versions[max(len(versions) - keep_last, 0):]
+            if cutoff is not None:
+                kept = [v for v in kept[:-1] if v["time"] >= cutoff] + kept[-1:]
+            removed_versions += len(versions) - len(kept)
+            if not kept:
+                del self.files[name]
+                self.dirty = True
+            elif len(kept) != len(versions):
+                self.files[name] = kept
+                self.dirty = True
+        self.save()
+
+        referenced = {v["hash"] for versions in self.files.values() for v in versions}
+        removed_blobs = 0
+        blobs_dir = self.root / "blobs"
+        if blobs_dir.exists():
+            for blob in blobs_dir.glob("*/*"):
+                if blob.name not in referenced:
+                    blob.unlink()
+                    removed_blobs += 1
+        return removed_versions, removed_blobs
+
+
+def backup_files(file_paths) -> int:
+    """Back up several files, saving each directory's manifest once. Returns the count."""
+    stores = {}
+    count = 0
+    for file_path in file_paths:
+        directory = os.path.dirname(os.path.abspath(file_path))
+        store = stores.get(directory)
+        if store is None:
+            store = stores[directory] = BackupStore(directory)
+        store.backup(file_path)
+        count += 1
+    for store in stores.values():
+        store.save()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List, restore and prune content-addressed backups")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ls = sub.add_parser("list", help="List backed-up versions")
+    ls.add_argument("directory", help="Folder whose backup/ store to read")
+    ls.add_argument("name", nargs="?", help="Only this file")
+    rs = sub.add_parser("restore", help="Restore a backed-up version")
+    rs.add_argument("directory")
+    rs.add_argument("name")
+    rs.add_argument("--version", default="-1",
+                    help="Index as listed, e.g. [0] or -2 (-1 = latest, the default), "
+                         "or a hash/timestamp prefix")
+    rs.add_argument("--to", help="Write here instead of over the original file")
+    pr = sub.add_parser("prune", help="Apply retention limits and delete unused blobs")
+    pr.add_argument("directory")
+    pr.add_argument("--keep-last", type=int, help="Versions to keep per file")
+    pr.add_argument("--max-age-days", type=float, help="Drop versions older than this (latest is kept)")
+    args = parser.parse_args()
+    if args.command == "prune" and args.keep_last is not None and args.keep_last < 0:
+        parser.error("--keep-last must be 0 or more")
+
+    store = BackupStore(args.directory)
+    if args.command == "list":
+        names = [args.name] if args.name else sorted(store.files)
+        for name in names:
+            versions = store.files.get(name, [])
+            print(f"{name}: {len(versions)} versions")
+            for i, v in enumerate(versions):
+                print(f"  [{i - len(versions)}] {v['time']}  {v['hash'][:12]}  {v['size']} bytes")
+    elif args.command == "restore":
+        try:
+            target = store.restore(args.name, args.version, args.to)
+        except KeyError as e:
+            print(f"Error: {e.args[0]}")
+            return
+        print(f"Restored {args.name} to {target}")
+    else:
+        versions, blobs = store.prune(args.keep_last, args.max_age_days)
+        print(f"Removed {versions} versions and {blobs} blobs from {store.root}")
+
+
+if __name__ == "__main__":
+    main()
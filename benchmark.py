@@ -0,0 +1,302 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# benchmark.py
+# Measures how the deck generation pipeline scales. Synthesizes vocab CSVs
+# and verb JSON folders shaped like SourceData/Example at several sizes,
+# times every pipeline stage separately (wall/CPU, notes/sec, peak RSS) and
+# saves the results as JSON so runs from different commits can be compared.
+#
+# Usage:
+#   python benchmark.py                          # 1k/10k/100k vocab + verbs
+#   python benchmark.py --sizes 1000 10000 --types vocab
+#   python benchmark.py --compare bench_results/old.json
+#   python benchmark.py --types verb_io --sizes 1000 --io-latency 5
+#   python benchmark.py --writers sqlite
+#
+# The verb_io type times loading a verb folder one file at a time against
+# threaded reads, with --io-latency ms added to every read to stand in for a
+# network share. It isn't run by default.
+#
+# The package stage is run once per --writers entry (default: both) on the
+# same planned decks: "package" is genanki, "package_sqlite" the direct writer.
+
+import argparse
+import contextlib
+import copy
+import csv
+import datetime
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import GenerateAnkiDeck_cgpt as verb_gen
+import GenerateVocabDeck as vocab_gen
+from deck_packaging import PACKAGE_WRITERS, write_pending
+from id_service import IdService, set_default_service
+from verb_store import DEFAULT_IO_THREADS, FolderVerbStore
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+EXAMPLE_DIR = Path(__file__).parent / "SourceData" / "Example"
+RESULTS_DIR = Path(__file__).parent / "bench_results"
+DEFAULT_SIZES = [1000, 10000, 100000]
+CARD_TYPES = ("vocab", "verbs")
+BENCH_TYPES = CARD_TYPES + ("verb_io",)
+IO_THREAD_COUNTS = (1, 4, DEFAULT_IO_THREADS, 32)
+DEFAULT_IO_LATENCY_MS = 2.0
+
+# Roughly the shape of the A1 data: ~25 vocab notes per category, 10 verbs per deck.
+VOCAB_NOTES_PER_DECK = 25
+VERBS_PER_DECK = 10
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def synth_vocab_csv(csv_path: Path, n: int):
+    """Write an n-row vocab CSV by varying the rows of ExampleVocab.csv."""
+    with open(EXAMPLE_DIR / "Vocab" / "ExampleVocab.csv", "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+        templates = [row for row in reader if row]
+
+    col = {name: i for i, name in enumerate(header)}
+    n_categories = max(1, n // VOCAB_NOTES_PER_DECK)
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for i in range(n):
+            row = list(templates[i % len(templates)])
+            row[col["Italian"]] = f"{row[col['Italian']]}_{i}"
+            row[col["Category"]] = f"Category {i % n_categories}"
+            # Leave GUID columns blank so ensure_guids does real work
+            row[col["Deck Name"]] = row[col["Deck GUID"]] = row[col["Note GUID"]] = ""
+            writer.writerow(row)
+
+
+def synth_verb_folder(folder: Path, n: int):
+    """Write n verb JSON files by varying ExampleVerb.json."""
+    template = json.loads((EXAMPLE_DIR / "Verb" / "ExampleVerb.json").read_text(encoding="utf-8"))
+    folder.mkdir(parents=True, exist_ok=True)
+    for i in range(n):
+        verb = copy.deepcopy(template)
+        verb["infinitive"] = f"{template['infinitive']}_{i:06d}"
+        verb["regular"] = bool(i % 2)
+        deck = i // VERBS_PER_DECK
+        verb["deck_guid"] = str(1_000_000 + deck)
+        verb["deck_name"] = f"Italian::Bench::Verbs::deck_{deck:05d}"
+        verb.pop("note_guid", None)
+        (folder / f"{verb['infinitive']}.json").write_text(
+            json.dumps(verb, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+class StageRecorder:
+    """Times stages of one benchmark run and collects their metrics."""
+
+    def __init__(self, notes: int):
+        self.notes = notes
+        self.stages = []
+
+    def run(self, name, func, *args, **kwargs):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func(*args, **kwargs)
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        self.stages.append({
+            "stage": name,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "notes_per_s": round(self.notes / wall, 1) if wall > 0 else None,
+            "peak_rss_mb": peak_rss_mb(),
+        })
+        return result
+
+
+def package_stage(writer: str) -> str:
+    return "package" if writer == "genanki" else f"package_{writer}"
+
+
+class SlowFolderVerbStore(FolderVerbStore):
+    """A verb folder where every file read takes an extra `latency` seconds."""
+
+    def __init__(self, folder, latency: float, io_threads: int):
+        super().__init__(folder, io_threads=io_threads)
+        self.latency = latency
+
+    def _read_file(self, json_file: Path) -> str:
+        time.sleep(self.latency)
+        return super()._read_file(json_file)
+
+
+def bench_verb_io(n: int, workdir: Path, io_latency_ms: float) -> list[dict]:
+    folder = workdir / "verbs"
+    synth_verb_folder(folder, n)
+
+    rec = StageRecorder(n)
+    expected = None
+    for threads in IO_THREAD_COUNTS:
+        store = SlowFolderVerbStore(folder, io_latency_ms / 1000, io_threads=threads)
+        verbs = rec.run(f"load_{threads}_threads", store.load)
+        # Same verbs in the same order whatever the thread count
+        order = list(verbs)
+        del store, verbs  # so the next load's peak RSS doesn't include this one
+        if expected is None:
+            expected = order
+        elif order != expected:
+            raise AssertionError(f"Load order changed with {threads} threads")
+    return rec.stages
+
+
+def bench_vocab(n: int, workdir: Path, jobs: int, writers=PACKAGE_WRITERS) -> list[dict]:
+    csv_path = workdir / "vocab.csv"
+    synth_vocab_csv(csv_path, n)
+
+    rec = StageRecorder(n)
+    # ensure_guids includes validating each row, as the build does
+    rows = rec.run("ensure_guids", lambda: list(vocab_gen.stream_vocab_rows(str(csv_path))))
+    model = rec.run("model_build", vocab_gen._build_vocab_model)
+    created, pending = rec.run("plan", vocab_gen.plan_decks, vocab_gen.vocab_records(rows),
+                               str(workdir / "out"), model=model, force=True, level="Bench")
+    for writer in writers:
+        rec.run(package_stage(writer), write_pending, pending, n_jobs=jobs, writer=writer)
+    return rec.stages
+
+
+def bench_verbs(n: int, workdir: Path, jobs: int, writers=PACKAGE_WRITERS) -> list[dict]:
+    folder = workdir / "verbs"
+    synth_verb_folder(folder, n)
+
+    rec = StageRecorder(n)
+    # load includes validating and flattening each verb into a VerbRecord
+    verbs = rec.run("load", verb_gen.load_verb_corpus, str(folder))
+    del verbs  # plan loads the folder again
+    models = rec.run("model_build", lambda: (verb_gen.build_italian_verb_model(irregular=False),
+                                              verb_gen.build_italian_verb_model(irregular=True)))
+    created, pending = rec.run("plan", verb_gen.plan_verb_decks, str(folder), str(workdir / "out"),
+                               models=models, force=True, level="Bench")
+    for writer in writers:
+        rec.run(package_stage(writer), write_pending, pending, n_jobs=jobs, writer=writer)
+    return rec.stages
+
+
+def run_one(card_type: str, n: int, jobs: int, io_latency_ms: float = DEFAULT_IO_LATENCY_MS,
+            writers=PACKAGE_WRITERS) -> list[dict]:
+    """Run one benchmark in this process (called in a fresh worker per run)."""
+    # Each run checks its synthetic names for collisions on their own
+    set_default_service(IdService())
+    with tempfile.TemporaryDirectory(prefix="vocab_bench_") as tmp:
+        if card_type == "verb_io":
+            return bench_verb_io(n, Path(tmp), io_latency_ms)
+        bench = bench_vocab if card_type == "vocab" else bench_verbs
+        return bench(n, Path(tmp), jobs, writers)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results: dict, baseline_path: str):
+    """Print wall-time change per stage against an earlier results file."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["card_type"], r["notes"], s["stage"]): s
+           for r in baseline["runs"] for s in r["stages"]}
+
+    print(f"\n=== COMPARED TO {baseline['meta'].get('commit')} ({baseline_path}) ===")
+    for run in results["runs"]:
+        for stage in run["stages"]:
+            prev = old.get((run["card_type"], run["notes"], stage["stage"]))
+            if not prev or not prev["wall_s"]:
+                continue
+            change = (stage["wall_s"] - prev["wall_s"]) / prev["wall_s"] * 100
+            print(f"  {run['card_type']:<7} {run['notes']:>7} {stage['stage']:<15} "
+                  f"{prev['wall_s']:9.3f}s -> {stage['wall_s']:9.3f}s  ({change:+6.1f}%)")
+
+
+def print_results(results: dict):
+    print(f"\n=== BENCHMARK ({results['meta'].get('commit')}) ===")
+    print(f"  {'type':<7} {'notes':>7} {'stage':<15} {'wall s':>9} {'cpu s':>9} "
+          f"{'notes/s':>12} {'peak MB':>9}")
+    for run in results["runs"]:
+        for s in run["stages"]:
+            rss = f"{s['peak_rss_mb']:9.1f}" if s["peak_rss_mb"] is not None else f"{'n/a':>9}"
+            nps = f"{s['notes_per_s']:12.0f}" if s["notes_per_s"] is not None else f"{'n/a':>12}"
+            print(f"  {run['card_type']:<7} {run['notes']:>7} {s['stage']:<15} "
+                  f"{s['wall_s']:9.3f} {s['cpu_s']:9.3f} {nps} {rss}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the deck generation pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Note counts to synthesize (default: 1000 10000 100000)")
+    parser.add_argument("--types", nargs="+", choices=BENCH_TYPES, default=list(CARD_TYPES),
+                        help="Card types to benchmark (default: vocab verbs)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Worker processes for the package stage (default: 1)")
+    parser.add_argument("--writers", nargs="+", choices=PACKAGE_WRITERS, default=list(PACKAGE_WRITERS),
+                        help="Package writers to time on the same decks (default: both)")
+    parser.add_argument("--io-latency", type=float, default=DEFAULT_IO_LATENCY_MS,
+                        help=f"Simulated ms per file read for verb_io (default: {DEFAULT_IO_LATENCY_MS})")
+    parser.add_argument("--output", help="Results JSON path (default: bench_results/<commit>_<time>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "jobs": args.jobs,
+            "io_latency_ms": args.io_latency,
+            "writers": args.writers,
+        },
+        "runs": [],
+    }
+
+    for card_type in args.types:
+        for n in args.sizes:
+            print(f"Benchmarking {card_type} with {n} notes...")
+            # A fresh process per run keeps peak RSS figures independent
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                stages = pool.submit(run_one, card_type, n, args.jobs, args.io_latency,
+                                     args.writers).result()
+            results["runs"].append({"card_type": card_type, "notes": n, "stages": stages})
+
+    print_results(results)
+
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"{commit or 'nocommit'}_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
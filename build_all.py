@@ -0,0 +1,229 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# build_all.py
+# Builds every level and card type listed in config.json in a single process.
+# Models are built once and shared, all pending decks are packaged together,
+# and one combined summary with per-stage timings is printed at the end.
+# With --watch it keeps running and rebuilds decks as their sources change
+# (see watch_build.py).
+#
+# --package chooses the output: one .apkg per deck (decks, the default), one
+# <level>_Italian.apkg per level holding every deck as a subdeck in a single
+# collection (level), or both. The level package goes in <output_root>/<level>
+# (output_root in config.json, default Decks, so Decks/A1) whichever card
+# types are built, and is rebuilt when any of its decks change.
+
+import argparse
+import os
+import sys
+
+import GenerateAnkiDeck_cgpt as verb_gen
+import GenerateVocabDeck as vocab_gen
+from build_manifest import BuildManifest, combined_digest
+from deck_packaging import DEFAULT_WRITER, PACKAGE_WRITERS, PendingPackage, package_settings, write_pending
+from instrumentation import BuildMetrics
+from source_validation import ValidationFailed, finish_validation, run_validation
+from verb_store import DEFAULT_IO_THREADS
+from watch_build import POLL_INTERVAL, DeckWatcher
+
+CARD_TYPES = ("verbs", "vocab")
+PACKAGE_MODES = ("decks", "level", "both")
+DEFAULT_OUTPUT_ROOT = "Decks"
+
+
+def level_folder(config: dict, level: str) -> str:
+    """The folder a level's combined package goes in: <output_root>/<level>."""
+    return os.path.join(config.get("output_root", DEFAULT_OUTPUT_ROOT), level)
+
+
+def plan_level_package(level: str, level_config: dict, card_types, planned: list, folder: str,
+                       force: bool = False) -> PendingPackage:
+    """
+    Combine every deck planned for a level (current or not) into one
+    pending package in `folder`, marked `current` if the package on disk is
+    up to date. Returns None when the level has no decks.
+    """
+    if not planned:
+        return None
+    types = [card_type for card_type in CARD_TYPES if card_type in card_types and card_type in level_config]
+    suffix = "" if len(types) == len(CARD_TYPES) else "_" + "_".join(t.capitalize() for t in types)
+    filename = f"{level}_Italian{suffix}.apkg"
+
+    planned = sorted(planned, key=lambda p: p.deck.name)
+    os.makedirs(folder, exist_ok=True)
+    manifest = BuildManifest(folder)
+    digest = combined_digest((os.path.basename(p.output_path), p.digest) for p in planned)
+    current = not force and manifest.is_current(filename, digest)
+    info = {"filename": filename, "decks": len(planned), "count": sum(len(p.deck.notes) for p in planned),
+            "written": not current}
+    print(f"  {'Unchanged' if current else 'Planned'} {filename} ({len(planned)} decks)")
+    return PendingPackage([p.deck for p in planned], os.path.join(folder, filename), manifest, digest,
+                          info, current=current)
+
+
+def build_all(config: dict, levels=None, card_types=CARD_TYPES, force: bool = False, jobs: int = 1,
+              reproducible: bool = False, metrics: BuildMetrics = None, strict: bool = False,
+              io_threads: int = DEFAULT_IO_THREADS, writer: str = DEFAULT_WRITER,
+              package: str = "decks"):
+    """
+    Plan every (level, card type) in `config`, validating each verb and row
+    as it is loaded, then write all pending decks in one batch. Returns
+    (results, metrics) where results is a list of (level, card_type, created)
+    tuples in config order.
+    Stage times from every level are accumulated into the one `metrics`.
+    Verbs and rows with fatal validation errors are left out. With `strict`
+    every source is validated first (across `jobs` worker processes) and a
+    fatal error raises ValidationFailed before any source is loaded or written.
+    Verb folders are read with `io_threads` concurrent file reads, and
+    packages are written with `writer` (see deck_packaging). `package` is
+    one of PACKAGE_MODES; level packages appear in results as card type "level".
+    """
+    if metrics is None:
+        metrics = BuildMetrics()
+    level_names = levels or list(config["levels"].keys())
+
+    if strict:
+        sources = {card_type: [] for card_type in CARD_TYPES}
+        for level in level_names:
+            for card_type in card_types:
+                paths = config["levels"].get(level, {}).get(card_type)
+                if paths:
+                    sources[card_type].append(paths["source"])
+        print("Validating sources...")
+        run_validation(sources["verbs"], sources["vocab"], jobs=jobs, strict=True, metrics=metrics)
+
+    models = {}
+    with metrics.stage("model_build"):
+        if "verbs" in card_types:
+            models["verbs"] = (verb_gen.get_italian_verb_model(irregular=False),
+                               verb_gen.get_italian_verb_model(irregular=True))
+        if "vocab" in card_types:
+            models["vocab"] = vocab_gen.build_vocab_model()
+
+    settings = package_settings(reproducible, writer)
+    per_deck = package in ("decks", "both")
+    per_level = package in ("level", "both")
+    results = []
+    pending = []
+    errors = []
+    for level in level_names:
+        level_config = config["levels"].get(level)
+        if level_config is None:
+            print(f"Warning: level '{level}' not found in config.json")
+            continue
+
+        level_planned = []
+        for card_type in card_types:
+            paths = level_config.get(card_type)
+            if not paths:
+                continue
+
+            print(f"\n##### {level} {card_type} #####")
+            if card_type == "verbs":
+                created, planned = verb_gen.plan_verb_decks(
+                    paths["source"], paths["output"], models=models["verbs"], force=force, level=level,
+                    metrics=metrics, io_threads=io_threads, include_current=per_level, settings=settings,
+                    errors=errors)
+            else:
+                records = vocab_gen.stream_vocab_records(paths["source"], level=level, metrics=metrics,
+                                                         errors=errors)
+                created, planned = vocab_gen.plan_decks(
+                    records, paths["output"], model=models["vocab"], force=force, level=level,
+                    metrics=metrics, include_current=per_level, settings=settings)
+
+            level_planned.extend(planned)
+            if per_deck:
+                results.append((level, card_type, created))
+                pending.extend(planned)
+
+        if per_level:
+            level_package = plan_level_package(level, level_config, card_types, level_planned,
+                                               level_folder(config, level), force)
+            if level_package is not None:
+                results.append((level, "level", [level_package.info]))
+                pending.append(level_package)
+
+    finish_validation(errors, strict=strict, metrics=metrics)
+    print(f"\nPackaging {sum(not p.current for p in pending)} packages...")
+    with metrics.stage("package"):
+        write_pending(pending, n_jobs=jobs, reproducible=reproducible, writer=writer)
+
+    return results, metrics
+
+
+def print_summary(results):
+    print(f"\n=== SUMMARY ===")
+    total_written = 0
+    total_decks = 0
+    total_notes = 0
+    for level, card_type, created in results:
+        written = sum(1 for d in created if d["written"])
+        notes = sum(d.get("count", d.get("verb_count", 0)) for d in created)
+        print(f"  {level} {card_type}: {written} written, {len(created) - written} unchanged, "
+              f"{notes} notes")
+        total_written += written
+        total_decks += len(created)
+        total_notes += notes
+    print(f"Total: {total_written}/{total_decks} deck files written, {total_notes} notes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build every deck listed in config.json")
+    parser.add_argument("--level", action="append", dest="levels",
+                        help="Only build this level (repeatable, default: all levels)")
+    parser.add_argument("--type", action="append", dest="card_types", choices=CARD_TYPES,
+                        help="Only build this card type (repeatable, default: all types)")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild every deck, ignoring the build manifests")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Worker processes for packaging and --strict validation "
+                             "(0 = one per CPU, default: 1)")
+    parser.add_argument("--io-threads", type=int, default=DEFAULT_IO_THREADS,
+                        help=f"Concurrent verb file reads (1 = one at a time, default: {DEFAULT_IO_THREADS})")
+    parser.add_argument("--strict", action="store_true",
+                        help="Validate every source first and abort if there are fatal errors "
+                             "(default: leave those verbs and rows out)")
+    parser.add_argument("--reproducible", action="store_true",
+                        help="Byte-identical output for identical input (fixed epoch, zip metadata)")
+    parser.add_argument("--writer", choices=PACKAGE_WRITERS, default=DEFAULT_WRITER,
+                        help=f"Package writer: genanki objects or direct sqlite inserts (default: {DEFAULT_WRITER})")
+    parser.add_argument("--package", choices=PACKAGE_MODES, default="decks",
+                        help="One .apkg per deck (decks, default), one per level with every deck "
+                             "as a subdeck (level), or both")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and rebuild only the decks whose sources change")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL,
+                        help=f"Seconds between source polls in --watch mode (default: {POLL_INTERVAL})")
+    parser.add_argument("--report", help="Write a JSON timing/counter report to this path")
+    parser.add_argument("--profile", action="store_true",
+                        help="Also capture cProfile (.prof next to the report) and tracemalloc stats")
+    args = parser.parse_args()
+
+    if args.watch:
+        watcher = DeckWatcher(vocab_gen.load_config(), levels=args.levels,
+                              card_types=args.card_types or CARD_TYPES, jobs=args.jobs,
+                              reproducible=args.reproducible, strict=args.strict, writer=args.writer,
+                              package=args.package)
+        watcher.run(interval=args.interval, force=args.force)
+        return
+
+    metrics = BuildMetrics()
+    if args.profile:
+        metrics.start_profiling()
+
+    config = vocab_gen.load_config()
+    try:
+        results, metrics = build_all(config, levels=args.levels,
+                                     card_types=args.card_types or CARD_TYPES, force=args.force,
+                                     jobs=args.jobs, reproducible=args.reproducible, metrics=metrics,
+                                     strict=args.strict, io_threads=args.io_threads,
+                                     writer=args.writer, package=args.package)
+    except ValidationFailed as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print_summary(results)
+    metrics.finish(args.report, profile=args.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# build_manifest.py
+# Tracks a content hash per generated .apkg so that unchanged decks can be
+# skipped on the next run. The manifest lives next to the decks it describes.
+#
+# It also remembers which file each deck id was last written to. Verb deck
+# files are named after their first and last verb, so a deck that grows gets
+# a new filename; once the new file is written the old one and its entry
+# are removed instead of being left behind with the same deck id.
+
+import hashlib
+import json
+import os
+
+from helpers import atomic_open
+
+MANIFEST_FILENAME = ".build_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True).encode("utf-8")
+
+
+def model_digest(model) -> str:
+    """
+    Hash everything about a genanki Model that ends up in a package:
+    id, name, field list, templates and CSS.
+    """
+    payload = {
+        "id": model.model_id,
+        "name": model.name,
+        "fields": [f["name"] for f in model.fields],
+        "templates": [[t["name"], t["qfmt"], t["afmt"]] for t in model.templates],
+        "css": model.css,
+    }
+    return hashlib.sha256(_dumps(payload)).hexdigest()
+
+
+def deck_digest(deck_id: int, deck_name: str, notes, settings=None) -> str:
+    """
+    Hash a deck's identity and its notes.
+    `notes` is an iterable of (note_guid, model_digest, fields) tuples, in the
+    order they are added to the deck. `settings` is
+    deck_packaging.package_settings(), so switching --writer or
+    --reproducible (or SOURCE_DATE_EPOCH) rewrites the deck; the default
+    build's None adds nothing, and its digests are unchanged.
+    """
+    h = hashlib.sha256()
+    h.update(_dumps([MANIFEST_VERSION, deck_id, deck_name]))
+    if settings is not None:
+        h.update(_dumps(["settings", settings]))
+    for note_guid, model_hash, fields in notes:
+        h.update(_dumps([str(note_guid), model_hash, list(fields)]))
+    return h.hexdigest()
+
+
+def combined_digest(deck_digests) -> str:
+    """Hash a combined package from its decks' (filename, digest) pairs."""
+    h = hashlib.sha256()
+    h.update(_dumps([MANIFEST_VERSION, "combined"]))
+    for filename, digest in sorted(deck_digests):
+        h.update(_dumps([filename, digest]))
+    return h.hexdigest()
+
+
+class BuildManifest:
+    """
+    Map of output filename -> deck digest, persisted as JSON in the output folder.
+    A deck is current when its digest matches and the .apkg is still on disk.
+    """
+
+    def __init__(self, output_folder: str):
+        self.output_folder = output_folder
+        self.path = os.path.join(output_folder, MANIFEST_FILENAME)
+        self.entries = {}
+        self.deck_files = {}  # str(deck id) -> filename
+        self.superseded = {}  # new filename -> (deck id, old filename), until it is written
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print(f"  Warning: ignoring unreadable build manifest {self.path}")
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.entries = data.get("decks", {})
+            self.deck_files = data.get("deck_files", {})
+
+    def track(self, deck_id, filename: str):
+        """
+        Note that deck `deck_id` is planned as `filename`. If it was written
+        under another name before, that file is removed when this one is
+        recorded.
+        """
+        deck_id = str(deck_id)
+        old = self.deck_files.get(deck_id)
+        if old is None:
+            self.deck_files[deck_id] = filename
+            self.dirty = True
+        elif old != filename:
+            self.superseded[filename] = (deck_id, old)
+
+    def is_current(self, filename: str, digest: str) -> bool:
+        if self.entries.get(filename) != digest:
+            return False
+        return os.path.exists(os.path.join(self.output_folder, filename))
+
+    def record(self, filename: str, digest: str):
+        if self.entries.get(filename) != digest:
+            self.entries[filename] = digest
+            self.dirty = True
+        if filename in self.superseded:
+            deck_id, old = self.superseded.pop(filename)
+            self.deck_files[deck_id] = filename
+            self.entries.pop(old, None)
+            old_path = os.path.join(self.output_folder, old)
+            if os.path.exists(old_path):
+                os.remove(old_path)
+                print(f"  Removed {old} (deck is now {filename})")
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(self.output_folder, exist_ok=True)
+        with atomic_open(self.path) as f:
+            json.dump({"version": MANIFEST_VERSION, "decks": self.entries, "deck_files": self.deck_files},
+                      f, indent=2, sort_keys=True)
+        self.dirty = False
@@ -0,0 +1,227 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# change_set.py
+# Change sets for the verb updater scripts. An updater edits verbs through a
+# TrackedStore, which remembers each verb as it was loaded; the differences
+# become a ChangeSet holding one JSON patch (RFC 6902 add/remove/replace
+# ops) per changed verb. A change set can be printed, saved for review
+# (--dry-run --save-changes) and applied later (--apply-changes).
+#
+# Applying checks every verb against the hash it had when the change set was
+# made, backs up only the files being touched (into the deduplicated
+# backup store, see backup_store.py), and writes them through the
+# verb store, which stages every file before renaming any into place.
+
+import copy
+import hashlib
+import json
+from pathlib import Path
+
+from backup_store import backup_files
+from verb_store import open_verb_store
+
+CHANGE_SET_VERSION = 1
+
+
+class StaleChangeSet(Exception):
+    """A verb changed on disk after the change set was made."""
+
+
+def doc_hash(doc) -> str:
+    return hashlib.sha256(
+        json.dumps(doc, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _pointer(path: str, key) -> str:
+    return f"{path}/{str(key).replace('~', '~0').replace('/', '~1')}"
+
+
+def json_diff(old, new, path: str = "") -> list[dict]:
+    """JSON patch ops turning `old` into `new`. Dicts are diffed key by key."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": _pointer(path, key)})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": _pointer(path, key), "value": value})
+            elif old[key] != value:
+                ops.extend(json_diff(old[key], value, _pointer(path, key)))
+        return ops
+    if old == new and type(old) is type(new):
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def apply_patch(doc, ops: list[dict]):
+    """Return a copy of `doc` with the add/remove/replace `ops` applied."""
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        if op["path"] == "":
+            doc = copy.deepcopy(op["value"])
+            continue
+        *parents, last = [part.replace("~1", "/").replace("~0", "~")
+                          for part in op["path"].split("/")[1:]]
+        target = doc
+        for part in parents:
+            target = target[part]
+        if op["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = copy.deepcopy(op["value"])
+    return doc
+
+
+class ChangeSet:
+    """{infinitive: {"file", "base", "ops"}} for one verb source."""
+
+    def __init__(self, source, files=None):
+        self.source = str(source)
+        self.files = files or {}
+
+    def __len__(self):
+        return len(self.files)
+
+    def op_count(self) -> int:
+        return sum(len(entry["ops"]) for entry in self.files.values())
+
+    def to_dict(self) -> dict:
+        return {"version": CHANGE_SET_VERSION, "source": self.source, "files": self.files}
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+        print(f"Saved change set ({len(self)} files, {self.op_count()} changes) to {path}")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CHANGE_SET_VERSION:
+            raise ValueError(f"{path}: unsupported change set version {data.get('version')}")
+        return cls(data["source"], data["files"])
+
+    def print_summary(self, verbose: bool = False):
+        print(f"Change set for {self.source}: {len(self)} files, {self.op_count()} changes")
+        for infinitive, entry in sorted(self.files.items()):
+            print(f"  {Path(entry['file']).name}: {len(entry['ops'])} changes")
+            if verbose:
+                for op in entry["ops"]:
+                    value = f" = {json.dumps(op['value'], ensure_ascii=False)[:80]}" if "value" in op else ""
+                    print(f"    {op['op']} {op['path']}{value}")
+
+    def apply(self, backup: bool = True) -> int:
+        """
+        Apply the change set to the verb source. Raises StaleChangeSet, and
+        writes nothing, if any verb no longer matches its recorded hash.
+        Returns the number of verbs written.
+        """
+        if not self.files:
+            return 0
+        store = open_verb_store(self.source)
+        updated = {}
+        for infinitive, entry in self.files.items():
+            current = store.get(infinitive)
+            if current is None or doc_hash(current) != entry["base"]:
+                raise StaleChangeSet(f"{infinitive} changed since the change set was made; "
+                                     f"nothing was written")
+            updated[infinitive] = apply_patch(current, entry["ops"])
+
+        if backup:
+            backup_files(sorted({str(store.source_of(infinitive)) for infinitive in updated}))
+        for infinitive, data in updated.items():
+            store.put(infinitive, data)
+        store.save()
+        return len(updated)
+
+
+class TrackedStore:
+    """
+    A verb store wrapper for the updaters: same get/load/put API, but
+    nothing is written. change_set() diffs every verb read through it
+    against the copy taken when it was first read.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.store = open_verb_store(source)
+        self._originals = {}
+
+    def _track(self, infinitive, data):
+        if data is not None and infinitive not in self._originals:
+            self._originals[infinitive] = copy.deepcopy(data)
+        return data
+
+    def load(self) -> dict:
+        verbs = self.store.load()
+        for infinitive, data in verbs.items():
+            self._track(infinitive, data)
+        return verbs
+
+    def get(self, infinitive: str):
+        return self._track(infinitive, self.store.get(infinitive))
+
+    def put(self, infinitive: str, verb_data: dict):
+        self._track(infinitive, self.store.get(infinitive))
+        self.store.put(infinitive, verb_data)
+
+    def mark_changed(self, infinitive: str):
+        pass  # changes are found by diffing, see change_set()
+
+    def source_of(self, infinitive: str) -> Path:
+        return self.store.source_of(infinitive)
+
+    def change_set(self) -> ChangeSet:
+        files = {}
+        for infinitive, original in self._originals.items():
+            ops = json_diff(original, self.store.get(infinitive))
+            if ops:
+                files[infinitive] = {
+                    "file": str(self.store.source_of(infinitive)),
+                    "base": doc_hash(original),
+                    "ops": ops,
+                }
+        return ChangeSet(self.source, dict(sorted(files.items())))
+
+
+def add_change_set_arguments(parser):
+    """The --dry-run / --save-changes / --apply-changes options shared by the updaters."""
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Show the change set without writing any verb file")
+    parser.add_argument("--save-changes", metavar="PATH",
+                        help="Write the change set (JSON patch per verb) to PATH")
+    parser.add_argument("--apply-changes", metavar="PATH",
+                        help="Apply a change set saved earlier with --save-changes, then exit")
+    parser.add_argument("--no-backup", action="store_true",
+                        help="Don't back up the files being changed")
+
+
+def apply_saved_changes(args) -> bool:
+    """Handle --apply-changes. Returns True if it ran (the updater should stop)."""
+    if not args.apply_changes:
+        return False
+    change_set = ChangeSet.load(args.apply_changes)
+    change_set.print_summary()
+    try:
+        written = change_set.apply(backup=not args.no_backup)
+    except StaleChangeSet as e:
+        print(f"Error: {e}")
+        return True
+    print(f"Applied {args.apply_changes}: {written} files written")
+    return True
+
+
+def finish(tracked: TrackedStore, args, verbose: bool = False) -> ChangeSet:
+    """Summarize the tracked changes, then save and/or apply them per `args`."""
+    change_set = tracked.change_set()
+    print()
+    change_set.print_summary(verbose=verbose)
+    if args.save_changes:
+        change_set.save(args.save_changes)
+    if args.dry_run:
+        print("Dry run: no verb files were written")
+    else:
+        written = change_set.apply(backup=not args.no_backup)
+        print(f"Wrote {written} verb files")
+    return change_set
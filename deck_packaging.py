@@ -0,0 +1,270 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# deck_packaging.py
+# Writes planned decks to .apkg files, either serially or spread across a
+# process pool. Every deck is independent, so packaging parallelizes cleanly.
+# In reproducible mode identical inputs produce byte-identical .apkg files.
+#
+# Two package writers are available (--writer):
+#   genanki - builds genanki Note objects and lets genanki insert them one
+#             row at a time
+#   sqlite  - writes the same notes and cards rows straight into the
+#             collection with one executemany per table, in one transaction
+# Both give collections with the same rows (ids, GUIDs, fields, cards, deck
+# and model JSON), so Anki imports them identically. The files themselves
+# are laid out differently, so a deck's reproducible bytes depend on the writer.
+#
+# A package may also hold several decks (a list of PlannedDecks), written
+# into one collection and one zip; build_all.py uses this for --package level.
+
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import genanki
+from genanki.apkg_col import APKG_COL
+from genanki.apkg_schema import APKG_SCHEMA
+
+# Fixed build time for reproducible packages (2024-01-01T00:00:00Z); the
+# SOURCE_DATE_EPOCH environment variable overrides it.
+REPRODUCIBLE_EPOCH = 1704067200
+# Earliest timestamp a zip entry can hold.
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+PACKAGE_WRITERS = ("genanki", "sqlite")
+DEFAULT_WRITER = "genanki"
+
+
+class PlannedDeck(NamedTuple):
+    """A deck to package. `notes` holds (note_guid, genanki.Model, fields) tuples."""
+    deck_id: int
+    name: str
+    notes: list
+
+
+class PendingPackage(NamedTuple):
+    """A deck (or list of decks for one combined package) planned but not yet written."""
+    deck: PlannedDeck
+    output_path: str
+    manifest: object  # build_manifest.BuildManifest for the output folder
+    digest: str
+    info: dict  # summary entry returned to the caller
+    current: bool = False  # already up to date; planned only to go into a combined package
+
+
+def resolve_jobs(jobs: int) -> int:
+    """Turn a --jobs value into a worker count (0 means one per CPU)."""
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def reproducible_timestamp() -> float:
+    return float(os.environ.get("SOURCE_DATE_EPOCH", REPRODUCIBLE_EPOCH))
+
+
+def package_settings(reproducible: bool = False, writer: str = DEFAULT_WRITER):
+    """
+    What besides the notes decides a package's bytes, for the build manifest
+    digests (see build_manifest.deck_digest): the writer, and in reproducible
+    mode the epoch. None for the default genanki, non-reproducible build,
+    whose bytes differ on every run anyway.
+    """
+    if not reproducible and writer == DEFAULT_WRITER:
+        return None
+    return {"writer": writer, "epoch": reproducible_timestamp() if reproducible else None}
+
+
+def to_genanki_deck(deck: PlannedDeck) -> genanki.Deck:
+    result = genanki.Deck(deck_id=deck.deck_id, name=deck.name)
+    for note_guid, model, fields in deck.notes:
+        result.add_note(genanki.Note(guid=note_guid, model=model, fields=list(fields)))
+    return result
+
+
+def zip_collection(db_path: str, output_path: str, reproducible: bool = False):
+    """
+    Zip a collection database into an .apkg the way genanki does. With
+    `reproducible`, zip entry times and permissions are fixed so the bytes
+    depend only on the collection.
+    """
+    media = json.dumps({})
+    with zipfile.ZipFile(output_path, "w") as outzip:
+        if not reproducible:
+            outzip.write(db_path, "collection.anki2")
+            outzip.writestr("media", media)
+            return
+        with open(db_path, "rb") as f:
+            collection = f.read()
+        for name, data in (("collection.anki2", collection), ("media", media.encode("utf-8"))):
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+            info.external_attr = 0o644 << 16
+            outzip.writestr(info, data)
+
+
+def write_reproducible_package(package: genanki.Package, output_path: str, timestamp: float):
+    """
+    Same layout as genanki's Package.write_to_file, but with fixed zip entry
+    times and permissions, so the bytes depend only on the deck contents and
+    `timestamp` (which genanki uses for note/card mod times and ids).
+    """
+    fd, db_path = tempfile.mkstemp(suffix=".anki2")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(db_path)
+        package.write_to_db(conn.cursor(), timestamp, itertools.count(int(timestamp * 1000)))
+        conn.commit()
+        conn.close()
+        zip_collection(db_path, output_path, reproducible=True)
+    finally:
+        os.remove(db_path)
+
+
+def card_ords(model: genanki.Model, fields) -> list[int]:
+    """The card templates genanki would generate for a front/back note."""
+    ords = []
+    for card_ord, any_or_all, required in model._req:
+        op = all if any_or_all == "all" else any
+        if op(fields[i] for i in required):
+            ords.append(card_ord)
+    return ords
+
+
+def write_collection(cursor, decks: list, timestamp: float, id_gen):
+    """
+    Write `decks` into an empty collection: the rows genanki's
+    Package.write_to_db would write, with ids drawn from `id_gen` in the
+    same order (a note's id, then its cards'), but inserted with one
+    executemany per table per deck. genanki's warning about invalid HTML in
+    fields is not repeated here.
+    """
+    cursor.executescript(APKG_SCHEMA)
+    cursor.executescript(APKG_COL)
+    mod = int(timestamp)
+
+    for deck in decks:
+        if not isinstance(deck.deck_id, int):
+            raise TypeError(f"Deck id must be an integer, not {deck.deck_id}.")
+
+        (decks_json,) = cursor.execute("SELECT decks FROM col").fetchone()
+        col_decks = json.loads(decks_json)
+        col_decks[str(deck.deck_id)] = genanki.Deck(deck.deck_id, deck.name).to_json()
+        cursor.execute("UPDATE col SET decks = ?", (json.dumps(col_decks),))
+
+        models = {}
+        for _, model, _ in deck.notes:
+            models.setdefault(model.model_id, model)
+        (models_json,) = cursor.execute("SELECT models FROM col").fetchone()
+        col_models = json.loads(models_json)
+        col_models.update({model_id: model.to_json(timestamp, deck.deck_id)
+                           for model_id, model in models.items()})
+        cursor.execute("UPDATE col SET models = ?", (json.dumps(col_models),))
+
+        note_rows = []
+        card_rows = []
+        for note_guid, model, fields in deck.notes:
+            if model.model_type != genanki.Model.FRONT_BACK:
+                raise ValueError(f"The sqlite writer only handles front/back models, not {model.name}")
+            if len(fields) != len(model.fields):
+                raise ValueError(f"Number of fields in Model does not match number of fields in Note: "
+                                 f"{model.name} has {len(model.fields)} fields, but the note has {len(fields)}.")
+            note_id = next(id_gen)
+            if note_guid is None:
+                note_guid = genanki.guid_for(*fields)
+            note_rows.append((note_id, note_guid, model.model_id, mod, -1, "  ", "\x1f".join(fields),
+                              fields[model.sort_field_index], 0, 0, ""))
+            for card_ord in card_ords(model, fields):
+                card_rows.append((next(id_gen), note_id, deck.deck_id, card_ord, mod, -1,
+                                  0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, ""))
+        cursor.executemany("INSERT INTO notes VALUES(?,?,?,?,?,?,?,?,?,?,?)", note_rows)
+        cursor.executemany("INSERT INTO cards VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", card_rows)
+
+
+def write_sqlite_package(decks: list, output_path: str, timestamp: float, reproducible: bool = False):
+    """Write `decks` into one .apkg with write_collection."""
+    fd, db_path = tempfile.mkstemp(suffix=".anki2")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(db_path)
+        # A scratch file: nothing is lost by skipping fsyncs
+        conn.execute("PRAGMA synchronous = OFF")
+        write_collection(conn.cursor(), decks, timestamp, itertools.count(int(timestamp * 1000)))
+        conn.commit()
+        conn.close()
+        zip_collection(db_path, output_path, reproducible)
+    finally:
+        os.remove(db_path)
+
+
+def write_package(deck, output_path: str, timestamp: float,
+                  reproducible: bool = False, writer: str = DEFAULT_WRITER) -> str:
+    """
+    Write a PlannedDeck, or a list of them as one package, to `output_path`
+    with `writer` and return the path.
+    """
+    decks = deck if isinstance(deck, list) else [deck]
+    if writer == "sqlite":
+        write_sqlite_package(decks, output_path, timestamp, reproducible)
+        return output_path
+    package = genanki.Package([to_genanki_deck(d) for d in decks])
+    if reproducible:
+        write_reproducible_package(package, output_path, timestamp)
+    else:
+        package.write_to_file(output_path, timestamp=timestamp)
+    return output_path
+
+
+def _write_package_job(job) -> str:
+    return write_package(*job)
+
+
+def write_packages(jobs: list, n_jobs: int = 1, timestamp: float = None,
+                   reproducible: bool = False, writer: str = DEFAULT_WRITER) -> list[str]:
+    """
+    Write a list of (deck, output_path) pairs and return the output paths in
+    the same order. With n_jobs > 1 the packages are built in worker processes.
+
+    All packages in one call share a single timestamp, so the serial and
+    parallel paths produce the same collections. With `reproducible` the
+    timestamp defaults to a fixed epoch and zip metadata is pinned too.
+    `writer` is one of PACKAGE_WRITERS.
+    """
+    if timestamp is None:
+        timestamp = reproducible_timestamp() if reproducible else time.time()
+
+    if writer not in PACKAGE_WRITERS:
+        raise ValueError(f"Unknown package writer '{writer}' (expected one of {PACKAGE_WRITERS})")
+    work = [(deck, output_path, timestamp, reproducible, writer) for deck, output_path in jobs]
+    n_jobs = min(resolve_jobs(n_jobs), len(work))
+    if n_jobs <= 1:
+        return [_write_package_job(job) for job in work]
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return list(pool.map(_write_package_job, work))
+
+
+def write_pending(pending: list, n_jobs: int = 1, timestamp: float = None,
+                  reproducible: bool = False, writer: str = DEFAULT_WRITER) -> list[str]:
+    """
+    Write planned decks (possibly from several generators and output folders)
+    in one batch, then record their digests in the owning build manifests.
+    Entries marked `current` are skipped.
+    """
+    pending = [p for p in pending if not p.current]
+    paths = write_packages([(p.deck, p.output_path) for p in pending], n_jobs, timestamp,
+                           reproducible=reproducible, writer=writer)
+
+    manifests = {}
+    for p in pending:
+        p.manifest.record(os.path.basename(p.output_path), p.digest)
+        manifests[id(p.manifest)] = p.manifest
+    for manifest in manifests.values():
+        manifest.save()
+
+    return paths
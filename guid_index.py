@@ -0,0 +1,152 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# guid_index.py
+# One index of every note and deck GUID in every level's vocab CSV and verb
+# source, built in a single pass. Anki identifies notes by GUID, so two
+# rows sharing a note GUID overwrite each other on import:
+#   duplicate - the same word in more than one place (vocab note GUIDs come
+#               from the Italian string alone, so homographs clash)
+#   collision - different words with the same GUID (40-bit stable_id clash
+#               or a hand-edited GUID)
+# Deck GUIDs may repeat on every row of a deck, but a deck GUID used with
+# two different deck names is a collision.
+#
+# Usage:
+#   python guid_index.py                       # report for every level in config.json
+#   python guid_index.py --level A1 --lookup 474254468253
+
+import argparse
+import json
+from pathlib import Path
+from typing import NamedTuple
+
+from GenerateVocabDeck import iter_vocab_rows
+from verb_store import open_verb_store
+
+NOTE = "note"
+DECK = "deck"
+
+
+class GuidEntry(NamedTuple):
+    guid: str
+    kind: str  # NOTE or DECK
+    card_type: str  # "vocab" or "verbs"
+    level: str
+    file: str
+    location: str  # "row[N]" for vocab, the infinitive for verbs
+    name: str  # Italian word, infinitive or deck name
+
+    def __str__(self):
+        return f"{self.level} {self.card_type} {self.kind} '{self.name}' ({self.file} {self.location})"
+
+
+class GuidIndex:
+    def __init__(self):
+        self.entries = {NOTE: {}, DECK: {}}
+
+    def add(self, entry: GuidEntry):
+        self.entries[entry.kind].setdefault(entry.guid, []).append(entry)
+
+    def add_vocab_csv(self, csv_path, level: str):
+        csv_path = str(csv_path)
+        for index, row in enumerate(iter_vocab_rows(csv_path), 1):
+            location = f"row[{index}]"
+            note_guid = (row.get("Note GUID") or "").strip()
+            if note_guid:
+                self.add(GuidEntry(note_guid, NOTE, "vocab", level, csv_path, location,
+                                   (row.get("Italian") or "").strip()))
+            deck_guid = (row.get("Deck GUID") or "").strip()
+            if deck_guid:
+                self.add(GuidEntry(deck_guid, DECK, "vocab", level, csv_path, location,
+                                   (row.get("Deck Name") or "").strip()))
+
+    def add_verb_source(self, source, level: str):
+        store = open_verb_store(source)
+        for infinitive, data in store.load().items():
+            file = str(store.source_of(infinitive))
+            if data.get("note_guid"):
+                self.add(GuidEntry(str(data["note_guid"]), NOTE, "verbs", level, file, infinitive,
+                                   data.get("infinitive", infinitive)))
+            if data.get("deck_guid"):
+                self.add(GuidEntry(str(data["deck_guid"]), DECK, "verbs", level, file, infinitive,
+                                   data.get("deck_name", "")))
+
+    @classmethod
+    def build(cls, config: dict, levels=None):
+        """Index every vocab CSV and verb source in `config` (optionally only `levels`)."""
+        index = cls()
+        for level in levels or list(config["levels"].keys()):
+            level_config = config["levels"].get(level, {})
+            if "vocab" in level_config:
+                index.add_vocab_csv(level_config["vocab"]["source"], level)
+            if "verbs" in level_config:
+                index.add_verb_source(level_config["verbs"]["source"], level)
+        return index
+
+    def lookup(self, guid) -> list[GuidEntry]:
+        """Every note and deck entry that uses `guid`."""
+        guid = str(guid)
+        return self.entries[NOTE].get(guid, []) + self.entries[DECK].get(guid, [])
+
+    def note_duplicates(self) -> dict:
+        """Note GUIDs shared by several entries with the same name."""
+        return {guid: entries for guid, entries in self.entries[NOTE].items()
+                if len(entries) > 1 and len({e.name for e in entries}) == 1}
+
+    def note_collisions(self) -> dict:
+        """Note GUIDs shared by entries with different names."""
+        return {guid: entries for guid, entries in self.entries[NOTE].items()
+                if len({e.name for e in entries}) > 1}
+
+    def deck_collisions(self) -> dict:
+        """Deck GUIDs used with more than one deck name."""
+        return {guid: entries for guid, entries in self.entries[DECK].items()
+                if len({e.name for e in entries}) > 1}
+
+    def print_report(self):
+        print(f"Indexed {len(self.entries[NOTE])} note GUIDs and {len(self.entries[DECK])} deck GUIDs")
+        sections = [
+            ("NOTE GUID COLLISIONS", self.note_collisions(), False),
+            ("DECK GUID COLLISIONS", self.deck_collisions(), True),
+            ("DUPLICATE NOTES", self.note_duplicates(), False),
+        ]
+        for title, found, by_name in sections:
+            if not found:
+                continue
+            print(f"\n=== {title} ({len(found)}) ===")
+            for guid, entries in found.items():
+                print(f"  {guid}:")
+                if by_name:
+                    # Deck entries repeat per row; show one line per distinct name
+                    entries = list({e.name: e for e in entries}.values())
+                for entry in entries:
+                    print(f"    {entry}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report GUID collisions and duplicate notes")
+    parser.add_argument("--level", action="append", dest="levels",
+                        help="Only index this level (repeatable, default: all levels)")
+    parser.add_argument("--lookup", nargs="+", default=[], metavar="GUID",
+                        help="Show where these GUIDs are used")
+    args = parser.parse_args()
+
+    with open(Path(__file__).parent / "config.json", "r", encoding="utf-8") as f:
+        config = json.load(f)
+    index = GuidIndex.build(config, levels=args.levels)
+
+    if args.lookup:
+        for guid in args.lookup:
+            entries = index.lookup(guid)
+            print(f"{guid}:")
+            for entry in entries:
+                print(f"  {entry}")
+            if not entries:
+                print("  not found")
+        return
+
+    index.print_report()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
+import contextlib
 import csv
-import datetime
 import hashlib
+import os
+import stat
+import tempfile
 import unicodedata
-from os import path, mkdir, rename
-from shutil import copyfile
+from os import path
 
 def stable_id(name: str) -> int:
     """
@@ -14,40 +16,78 @@ def stable_id(name: str) -> int:
     return int(digest[:10], 16)
 
 
+def iter_csv(csv_path: str):
+    """
+    Stream the CSV one row (list of strings) at a time, header first.
+    Opened with newline="" so quoted fields may contain embedded newlines.
+    Blank lines are skipped.
+    """
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if any(cell.strip() for cell in row):
+                yield row
+
+
 def load_csv(csv_path: str):
     """Read the CSV and return (header, rows). Rows are lists of strings."""
-    with open(csv_path, "r", encoding="utf-8") as f:
-        content = f.read().replace("\r\n", "\n").replace("\r", "\n")
-    reader = csv.reader(content.strip().split("\n"))
-    all_rows = list(reader)
-    header = all_rows[0]
-    data_rows = all_rows[1:]
+    rows = iter_csv(csv_path)
+    header = next(rows, [])
+    data_rows = list(rows)
     return header, data_rows
 
 
+def file_mode(file_path) -> int:
+    """
+    Permission bits for a file about to be replaced: those of the existing
+    file, or the umask default for a new one. mkstemp always creates 0600.
+    """
+    try:
+        return stat.S_IMODE(os.stat(file_path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+@contextlib.contextmanager
+def atomic_open(file_path, mode="w", encoding="utf-8", newline=None):
+    """
+    Open a temporary file next to `file_path` for writing and atomically
+    rename it over `file_path` when the block exits cleanly. On error the
+    original file is left untouched and the temporary file is removed.
+    The file keeps the permissions of the one it replaces.
+    """
+    directory = path.dirname(path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=path.basename(file_path) + ".", suffix=".tmp")
+    try:
+        with open(fd, mode, encoding=encoding, newline=newline) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, file_mode(file_path))
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
 def save_csv(csv_path: str, header, rows):
-    """Write header + rows back to the CSV."""
-    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+    """Write header + rows back to the CSV (atomically)."""
+    with atomic_open(csv_path, newline="") as f:
         writer = csv.writer(f)
         writer.writerow(header)
         writer.writerows(rows)
 
 
 def backup_file(file_path):
-    timestamp = datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S')
-
-    directory, file = path.split(file_path)
-
-    extension = file.split('.')[-1]
-    basename = file.split('.')[0]
-
-    new_name = f"{basename}.{timestamp}.{extension}"
-    new_directory = path.join(directory, 'backup')
-    if not path.exists(new_directory):
-        mkdir(new_directory)
+    """
+    Back up `file_path` into the content-addressed store in its folder's
+    backup/ directory (see backup_store.py). Unchanged content is not stored again.
+    """
+    from backup_store import backup_files  # backup_store imports this module
 
-    new_location = path.join(new_directory, new_name)
-    copyfile(file_path, new_location)
+    backup_files([file_path])
 
 def remove_accents(input_str):
   nfkd_form = unicodedata.normalize('NFKD', input_str)
@@ -0,0 +1,57 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# id_service.py
+# Memoized stable_id lookups for GUID assignment. Every name is hashed once
+# per process; deck names repeat for every row in a category, so most
+# lookups are dict hits. Nothing is persisted: an id is always the MD5 of
+# its name, so a stale or edited file can never hand out a wrong GUID.
+#
+# stable_id keeps only 40 bits of MD5, so two different names can get the
+# same id. Every id is checked against the other names looked up in this
+# process, and the clashes are collected in `collisions` instead of failing
+# silently.
+#
+# Tools that make up names (benchmark.py, tests) install a fresh IdService
+# with set_default_service() so their names don't count as collisions.
+
+from helpers import stable_id
+
+
+class IdService:
+    def __init__(self):
+        self.ids = {}  # name -> id for every name looked up
+        self.names = {}  # id -> first name looked up with it
+        self.collisions = []  # (id, existing name, new name)
+        self.reported = 0
+
+    def get(self, name: str) -> int:
+        value = self.ids.get(name)
+        if value is None:
+            value = self.ids[name] = stable_id(name)
+            existing = self.names.setdefault(value, name)
+            if existing != name:
+                self.collisions.append((value, existing, name))
+        return value
+
+    def report_collisions(self):
+        """Print the collisions found since the last report."""
+        for value, existing, name in self.collisions[self.reported:]:
+            print(f"  Warning: stable_id collision {value}: '{existing}' and '{name}'")
+        self.reported = len(self.collisions)
+
+
+_default = None
+
+
+def default_service() -> IdService:
+    """The process-wide IdService."""
+    global _default
+    if _default is None:
+        _default = IdService()
+    return _default
+
+
+def set_default_service(service: IdService):
+    """Replace the process-wide IdService, e.g. with a fresh IdService()."""
+    global _default
+    _default = service
@@ -0,0 +1,120 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# instrumentation.py
+# Lightweight per-stage timers and counters for the deck generators, with
+# optional cProfile / tracemalloc capture behind --profile. Produces a human
+# summary and a machine-readable JSON report.
+#
+# Stage times accumulate across calls, so a stage that runs once per row
+# (e.g. "validate" while streaming the vocab CSV) reports its total.
+# CPU times cover this process only, not --jobs worker processes.
+
+import contextlib
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+
+TOP_ALLOCATIONS = 20
+
+
+class BuildMetrics:
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.allocations = []
+        self.traced_peak_mb = None
+        self._profiler = None
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Time a block and add it to the stage's running totals."""
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+            entry["calls"] += 1
+            entry["wall_s"] += time.perf_counter() - wall_start
+            entry["cpu_s"] += time.process_time() - cpu_start
+
+    def timed_iter(self, name: str, iterable):
+        """Yield from `iterable`, charging the time spent producing each item to `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def start_profiling(self):
+        """Start cProfile and tracemalloc for the rest of the run."""
+        tracemalloc.start()
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def stop_profiling(self, prof_path: str = None):
+        if self._profiler is None:
+            return
+        self._profiler.disable()
+        if prof_path:
+            self._profiler.dump_stats(prof_path)
+        self._profiler = None
+
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.traced_peak_mb = round(peak / (1024 * 1024), 3)
+        self.allocations = [
+            {"location": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        ]
+
+    def report(self) -> dict:
+        return {
+            "total_wall_s": round(time.perf_counter() - self._wall_start, 6),
+            "total_cpu_s": round(time.process_time() - self._cpu_start, 6),
+            "stages": {
+                name: {"calls": s["calls"], "wall_s": round(s["wall_s"], 6), "cpu_s": round(s["cpu_s"], 6)}
+                for name, s in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            "traced_peak_mb": self.traced_peak_mb,
+            "top_allocations": self.allocations,
+        }
+
+    def print_summary(self):
+        report = self.report()
+        print(f"\n=== TIMINGS ===")
+        for name, s in report["stages"].items():
+            print(f"  {name:<24} {s['wall_s'] * 1000:9.1f} ms wall {s['cpu_s'] * 1000:9.1f} ms cpu")
+        print(f"  {'total':<24} {report['total_wall_s'] * 1000:9.1f} ms wall "
+              f"{report['total_cpu_s'] * 1000:9.1f} ms cpu")
+        if report["counters"]:
+            print("  " + ", ".join(f"{k}={v}" for k, v in report["counters"].items()))
+
+    def finish(self, report_path: str = None, profile: bool = False):
+        """
+        Stop profiling, print the summary and write the JSON report.
+        With `profile` the cProfile dump goes next to the report as .prof.
+        """
+        if profile and not report_path:
+            report_path = "build_report.json"
+        prof_path = os.path.splitext(report_path)[0] + ".prof" if profile else None
+        self.stop_profiling(prof_path)
+        self.print_summary()
+        if report_path:
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(self.report(), f, indent=2)
+            print(f"Wrote build report to {report_path}")
+            if prof_path:
+                print(f"Wrote cProfile stats to {prof_path}")
@@ -0,0 +1,129 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# model_cache.py
+# Caches built genanki Models in memory and on disk so that templates are
+# only re-read and re-expanded when a template file or the schema changes.
+# The cache key covers every template file's mtime and size plus any
+# schema parameters the builder depends on (e.g. ACTIVE_TENSES).
+
+import hashlib
+import inspect
+import json
+import os
+from pathlib import Path
+
+import genanki
+
+from helpers import atomic_open
+
+CACHE_PATH = Path(__file__).parent / ".cache" / "models.json"
+CACHE_VERSION = 1
+
+_memory = {}
+
+
+def template_signature(template_dir: Path) -> list:
+    """Return [name, mtime_ns, size] for every file in `template_dir`."""
+    signature = []
+    for entry in sorted(os.scandir(template_dir), key=lambda e: e.name):
+        if entry.is_file():
+            st = entry.stat()
+            signature.append([entry.name, st.st_mtime_ns, st.st_size])
+    return signature
+
+
+def model_key(kind: str, template_dir: Path, params) -> str:
+    payload = [CACHE_VERSION, kind, template_signature(template_dir), params]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _load_disk() -> dict:
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != CACHE_VERSION:
+        return {}
+    return data.get("models", {})
+
+
+def _save_disk(entries: dict):
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_open(CACHE_PATH) as f:
+        json.dump({"version": CACHE_VERSION, "models": entries}, f, ensure_ascii=False)
+
+
+def seed_req(model: genanki.Model, req) -> genanki.Model:
+    """
+    Give `model` a precomputed _req (the fields each card template needs),
+    so genanki doesn't render every template once per field to find out.
+
+    genanki (0.13) declares Model._req as a cached_property: a descriptor
+    without __set__ that stores its result in the instance __dict__ under
+    the same name, after which the instance entry is used. Writing that
+    entry first is what the first access would have done, and `req` always
+    comes from genanki's own computation (a cached model or a throwaway one),
+    so it is safe. If _req is declared any other way, or the entry isn't
+    picked up, the model is left alone and genanki computes _req itself.
+    genanki is pinned to 0.13.1 in environment.yml for this.
+    """
+    descriptor = inspect.getattr_static(type(model), "_req", None)
+    if type(descriptor).__name__ != "cached_property" or hasattr(descriptor, "__set__"):
+        return model
+    model.__dict__["_req"] = req
+    if model._req is not req:
+        del model.__dict__["_req"]
+    return model
+
+
+def _to_entry(model: genanki.Model, key: str) -> dict:
+    return {
+        "key": key,
+        "id": model.model_id,
+        "name": model.name,
+        "fields": [f["name"] for f in model.fields],
+        "templates": [{"name": t["name"], "qfmt": t["qfmt"], "afmt": t["afmt"]}
+                      for t in model.templates],
+        "css": model.css,
+        # genanki renders every template once per field to work this out
+        "req": model._req,
+    }
+
+
+def _from_entry(entry: dict) -> genanki.Model:
+    model = genanki.Model(
+        entry["id"],
+        entry["name"],
+        fields=[{"name": n} for n in entry["fields"]],
+        templates=[dict(t) for t in entry["templates"]],
+        css=entry["css"],
+    )
+    # Skip the required-field scan genanki already ran when the entry was made
+    return seed_req(model, entry["req"])
+
+
+def get_model(kind: str, template_dir: Path, params, build) -> genanki.Model:
+    """
+    Return the model for `kind`, calling `build()` only when no cached copy
+    matches the current template files and `params`.
+    """
+    key = model_key(kind, template_dir, params)
+    model = _memory.get(key)
+    if model is not None:
+        return model
+
+    entries = _load_disk()
+    entry = entries.get(kind)
+    if entry is not None and entry.get("key") == key:
+        model = _from_entry(entry)
+    else:
+        model = build()
+        entries[kind] = _to_entry(model, key)
+        try:
+            _save_disk(entries)
+        except OSError as e:
+            print(f"  Warning: could not write model cache {CACHE_PATH}: {e}")
+
+    _memory[key] = model
+    return model
@@ -0,0 +1,241 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# schema_validator.py
+# Compiled validators for verb JSON and vocab CSV data. The key paths to
+# check are worked out once from the lists in schemas.py, so validating a
+# record is a few set comparisons on its keys; the per-field walk only runs
+# for records that actually have a problem.
+#
+# Errors are returned as SchemaError records (file, path, code, subject)
+# rather than strings, so callers can filter or group them. Codes in
+# FATAL_CODES would make a deck build fail or produce a broken note; the
+# rest are warnings (the field is packaged blank).
+
+from operator import itemgetter
+from typing import NamedTuple
+
+from schemas import (
+    CONJUGATION_FIELDS,
+    PP_SOURCE_FIELDS,
+    VERB_PERSONS,
+    VERB_SOURCE_FIELDS,
+    VERB_TENSES,
+    VOCAB_COLUMNS,
+    VOCAB_GUID_COLUMNS,
+    VOCAB_REQUIRED_COLUMNS,
+)
+
+# Error codes
+MISSING_REQUIRED = "missing_required"
+MISSING_FIELD = "missing_field"
+MISSING_TENSE = "missing_tense"
+MISSING_PERSON = "missing_person"
+MISSING_PARTICIPLE = "missing_participle"
+MISSING_COLUMN = "missing_column"
+EMPTY_VALUE = "empty_value"
+SHORT_ROW = "short_row"
+WRONG_TYPE = "wrong_type"
+BAD_GUID = "bad_guid"
+BAD_DECK_GUID = "bad_deck_guid"  # derived from the deck name, so the build recomputes it
+UNREADABLE = "unreadable"
+
+FATAL_CODES = frozenset({MISSING_REQUIRED, MISSING_COLUMN, SHORT_ROW, WRONG_TYPE, BAD_GUID,
+                         UNREADABLE})
+
+
+class SchemaError(NamedTuple):
+    file: str
+    path: str
+    code: str
+    subject: str = ""
+
+    def __str__(self):
+        where = f"{self.file}: " if self.file else ""
+        return f"{where}'{self.subject}': {self.code} at {self.path}"
+
+    @property
+    def fatal(self) -> bool:
+        return self.code in FATAL_CODES
+
+
+def _all_strings(values) -> bool:
+    """True if every value is a str (str.join does the type check in C)."""
+    try:
+        "".join(values)
+    except TypeError:
+        return False
+    return True
+
+
+class VerbValidator:
+    """Checks verb dicts against VERB_TENSES / VERB_PERSONS / CONJUGATION_FIELDS."""
+
+    def __init__(self, tenses=VERB_TENSES, persons=VERB_PERSONS, fields=CONJUGATION_FIELDS):
+        self.top_fields = tuple(VERB_SOURCE_FIELDS)
+        self.top_set = frozenset(self.top_fields)
+        # Everything but "regular" is packaged as-is and must be text
+        self.top_text_fields = tuple(f for f in self.top_fields if f != "regular")
+        self.pp_fields = tuple((f, f"participio_passato.{f}") for f in PP_SOURCE_FIELDS)
+        self.pp_set = frozenset(PP_SOURCE_FIELDS)
+
+        field_set = frozenset(fields)
+        # (tense, path, [(person, path, field_set, [(field, path), ...]), ...])
+        self.tense_plan = tuple(
+            (tense, f"tenses.{tense}", tuple(
+                (person, f"tenses.{tense}.{person}", field_set,
+                 tuple((f, f"tenses.{tense}.{person}.{f}") for f in fields))
+                for person in persons))
+            for tense in tenses
+        )
+
+    def validate(self, verb_data: dict, file: str = "") -> list[SchemaError]:
+        if not isinstance(verb_data, dict):
+            return [SchemaError(file, "", WRONG_TYPE, "<unknown>")]
+        errors = []
+        subject = verb_data.get("infinitive", "<unknown>")
+
+        if not verb_data.keys() >= self.top_set:
+            errors.extend(SchemaError(file, key, MISSING_REQUIRED, subject)
+                          for key in self.top_fields if key not in verb_data)
+        if not _all_strings(verb_data.get(f, "") for f in self.top_text_fields):
+            errors.extend(SchemaError(file, key, WRONG_TYPE, subject) for key in self.top_text_fields
+                          if not isinstance(verb_data.get(key, ""), str))
+
+        deck_guid = verb_data.get("deck_guid")
+        if deck_guid and not str(deck_guid).isdigit():
+            errors.append(SchemaError(file, "deck_guid", BAD_GUID, subject))
+
+        # A block that isn't an object is a fatal WRONG_TYPE and isn't looked into
+        tenses = verb_data.get("tenses") or {}
+        if not isinstance(tenses, dict):
+            errors.append(SchemaError(file, "tenses", WRONG_TYPE, subject))
+            tenses = None
+        for tense, tense_path, person_plan in self.tense_plan if tenses is not None else ():
+            block = tenses.get(tense)
+            if block is None:
+                errors.append(SchemaError(file, tense_path, MISSING_TENSE, subject))
+                continue
+            if not isinstance(block, dict):
+                errors.append(SchemaError(file, tense_path, WRONG_TYPE, subject))
+                continue
+            for person, person_path, field_set, field_paths in person_plan:
+                vals = block.get(person)
+                if vals is None:
+                    errors.append(SchemaError(file, person_path, MISSING_PERSON, subject))
+                    continue
+                if not isinstance(vals, dict):
+                    errors.append(SchemaError(file, person_path, WRONG_TYPE, subject))
+                    continue
+                if not vals.keys() >= field_set:
+                    errors.extend(SchemaError(file, path, MISSING_FIELD, subject)
+                                  for field, path in field_paths if field not in vals)
+                if not _all_strings(vals.values()):
+                    errors.extend(SchemaError(file, path, WRONG_TYPE, subject)
+                                  for field, path in field_paths
+                                  if not isinstance(vals.get(field, ""), str))
+
+        pp = verb_data.get("participio_passato")
+        if not pp:
+            errors.append(SchemaError(file, "participio_passato", MISSING_PARTICIPLE, subject))
+        elif not isinstance(pp, dict):
+            errors.append(SchemaError(file, "participio_passato", WRONG_TYPE, subject))
+        else:
+            if not pp.keys() >= self.pp_set:
+                errors.extend(SchemaError(file, path, MISSING_FIELD, subject)
+                              for field, path in self.pp_fields if field not in pp)
+            if not _all_strings(pp.values()):
+                errors.extend(SchemaError(file, path, WRONG_TYPE, subject)
+                              for field, path in self.pp_fields
+                              if not isinstance(pp.get(field, ""), str))
+
+        return errors
+
+    def validate_all(self, items) -> list[SchemaError]:
+        """Validate an iterable of (file, verb_data) pairs in one call."""
+        errors = []
+        validate = self.validate
+        for file, verb_data in items:
+            errors.extend(validate(verb_data, str(file)))
+        return errors
+
+
+class VocabValidator:
+    """Checks vocab CSV rows for the VOCAB_COLUMNS header, required values and GUIDs."""
+
+    def __init__(self, columns=VOCAB_COLUMNS, required=VOCAB_REQUIRED_COLUMNS,
+                 guid_columns=VOCAB_GUID_COLUMNS):
+        self.columns = tuple(columns)
+        self.required = tuple(required)
+        self.guid_columns = tuple(guid_columns)
+        self.paths = tuple((col, f".{col}") for col in self.required)
+        self.guid_paths = tuple((col, f".{col}") for col in self.guid_columns)
+        self._getters = tuple(itemgetter(col) for col in self.required + self.guid_columns)
+
+    def validate_header(self, fieldnames, file: str = "") -> list[SchemaError]:
+        """Missing required/GUID columns are fatal, other missing columns are packaged blank."""
+        present = {name.strip() for name in fieldnames}
+        needed = set(self.required + self.guid_columns)
+        return [SchemaError(file, col, MISSING_COLUMN if col in needed else MISSING_FIELD, "<header>")
+                for col in self.columns if col not in present]
+
+    def validate_row(self, row: dict, index: int, file: str = "") -> list[SchemaError]:
+        """Validate one row; `index` is its 1-based position among the data rows."""
+        subject = (row.get("Italian") or "<unknown>").strip()
+        errors = [SchemaError(file, f"row[{index}]{path}", EMPTY_VALUE, subject)
+                  for col, path in self.paths if not (row.get(col) or "").strip()]
+        # csv.DictReader fills the columns missing from a short row with None
+        if None in row.values():
+            errors.append(SchemaError(file, f"row[{index}]", SHORT_ROW, subject))
+        # Blank GUIDs are filled in later; anything else must be an integer.
+        # A bad Deck GUID is only a warning since it is recomputed from the deck name.
+        for col, path in self.guid_paths:
+            value = (row.get(col) or "").strip()
+            if value and not value.isdigit():
+                code = BAD_DECK_GUID if col == "Deck GUID" else BAD_GUID
+                errors.append(SchemaError(file, f"row[{index}]{path}", code, subject))
+        return errors
+
+    def validate_rows(self, rows, file: str = "", start: int = 1) -> list[SchemaError]:
+        """
+        Validate a sequence of row dicts in one call. Works column by column:
+        each checked column is stripped with one map() over all rows, and
+        only rows with a bad value are revisited to build their errors.
+        """
+        if not isinstance(rows, (list, tuple)):
+            rows = list(rows)
+        n_required = len(self.required)
+        bad = set()
+        for i, getter in enumerate(self._getters):
+            try:
+                stripped = list(map(str.strip, map(getter, rows)))
+            except (KeyError, TypeError):
+                # A short row (None) or a missing column: check row by row
+                return [e for index, row in enumerate(rows, start)
+                        for e in self.validate_row(row, index, file)]
+            if i < n_required:
+                if "" in stripped:
+                    bad.update(j for j, value in enumerate(stripped) if not value)
+            else:
+                joined = "".join(stripped)
+                if joined and not joined.isdigit():
+                    bad.update(j for j, value in enumerate(stripped)
+                               if value and not value.isdigit())
+
+        errors = []
+        for i in sorted(bad):
+            errors.extend(self.validate_row(rows[i], i + start, file))
+        return errors
+
+
+VERB_VALIDATOR = VerbValidator()
+VOCAB_VALIDATOR = VocabValidator()
+
+
+def validate_verbs(items) -> list[SchemaError]:
+    """Validate (file, verb_data) pairs with the default verb schema."""
+    return VERB_VALIDATOR.validate_all(items)
+
+
+def validate_vocab_rows(rows, file: str = "") -> list[SchemaError]:
+    """Validate vocab row dicts with the default vocab schema."""
+    return VOCAB_VALIDATOR.validate_rows(rows, file)
@@ -32,10 +32,24 @@ VERB_METADATA_FIELDS = [
 # Past participle fields (appended after all tense fields).
 PP_FIELDS = ["pp_form", "pp_pronunciation", "pp_english", "pp_example", "pp_example_english"]
 
+# Keys every verb JSON file must have at the top level, and inside
+# "participio_passato". These are the source-data names of the fields above.
+VERB_SOURCE_FIELDS = ["infinitive", "infinitive_pronunciation", "english", "regular", "context"]
+PP_SOURCE_FIELDS = ["form", "pronunciation", "english", "example", "example_english"]
+
 # Tenses for which card templates are generated.
 # Extend this list to enable cards for additional tenses.
 ACTIVE_TENSES = ["presente"]
 
+# When True, the verb models carry only the fields their active templates
+# use (34 of the 100 with ACTIVE_TENSES = ["presente"]) instead of every
+# field from build_verb_field_names(). The model ids still come from
+# VERB_MODEL_SEED / IRREGULAR_VERB_MODEL_SEED, so note types and notes keep
+# their identity; collections built with the full field list take the
+# trimmed decks by importing with "Merge note types" (Anki 2.1.55+), which
+# matches fields by name and keeps the old fields on existing notes.
+TRIM_VERB_MODEL_FIELDS = False
+
 # Vocab CSV expected column names (used with csv.DictReader).
 VOCAB_COLUMNS = [
     "Italian",
@@ -53,6 +67,12 @@ VOCAB_COLUMNS = [
     "Note GUID",
 ]
 
+# Vocab columns that must have a non-empty value in every row.
+VOCAB_REQUIRED_COLUMNS = ["Italian", "English", "Category"]
+
+# Vocab columns holding integer GUIDs (filled in by ensure_guids when blank).
+VOCAB_GUID_COLUMNS = ["Deck GUID", "Note GUID"]
+
 # Fields included in the Anki vocab model (subset of VOCAB_COLUMNS, no GUID/deck cols).
 VOCAB_MODEL_FIELDS = [
     "Italian",
@@ -80,15 +100,22 @@ def build_verb_field_names():
     return fields
 
 
+# Offsets into the field tuple of a VerbRecord (see GenerateAnkiDeck_cgpt),
+# so a field is looked up by schema position rather than through a dict per verb.
+VERB_FIELD_NAMES = tuple(build_verb_field_names())
+VERB_FIELD_INDEX = {name: i for i, name in enumerate(VERB_FIELD_NAMES)}
+
+
 def validate_verb_data(verb_data: dict) -> list[str]:
     """
     Validate a verb JSON dict against the canonical schema.
     Returns a list of error strings (empty if valid).
+    See schema_validator for the batched version with structured errors.
     """
     errors = []
     infinitive = verb_data.get("infinitive", "<unknown>")
 
-    for key in ("infinitive", "infinitive_pronunciation", "english", "regular", "context"):
+    for key in VERB_SOURCE_FIELDS:
         if key not in verb_data:
             errors.append(f"{infinitive}: missing top-level field '{key}'")
 
@@ -109,7 +136,7 @@ def validate_verb_data(verb_data: dict) -> list[str]:
     if not pp:
         errors.append(f"{infinitive}: missing 'participio_passato'")
     else:
-        for field in ("form", "pronunciation", "english", "example", "example_english"):
+        for field in PP_SOURCE_FIELDS:
             if field not in pp:
                 errors.append(f"{infinitive}: missing '{field}' in participio_passato")
 
@@ -120,11 +147,12 @@ def validate_vocab_row(row: dict) -> list[str]:
     """
     Validate a vocab CSV row (as a dict from DictReader) against expected columns.
     Returns a list of error strings (empty if valid).
+    See schema_validator for the batched version with structured errors.
     """
     errors = []
     italian = row.get("Italian", "<unknown>").strip()
 
-    for col in ("Italian", "English", "Category"):
+    for col in VOCAB_REQUIRED_COLUMNS:
         val = row.get(col, "").strip()
         if not val:
             errors.append(f"'{italian}': missing required column '{col}'")
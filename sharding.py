@@ -0,0 +1,210 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# sharding.py
+# Automatic deck assignment under a note budget, replacing hand-maintained
+# deck mappings (verb_deck_mapping.csv + add_deck_guids.py). A source that
+# has a ProcessData/deck_shards.json file gets its deck names and GUIDs from
+# it on every build:
+#   verbs - all verbs of the level are split into "Part N" decks
+#   vocab - each category is one deck, split into "<Category> 2", ... once
+#           it grows past the budget
+# Assignments are stable: a note keeps its deck for as long as it exists,
+# and a new note goes into the first deck of its group with room, or a new
+# deck. Deck GUIDs are the stable_id of the deck name, like everywhere else.
+#
+# Usage:
+#   python sharding.py init SourceData/A1/Verbs/CardSource --level A1 --budget 10
+#   python sharding.py init SourceData/A1/Vocab/CardSource/A1_Vocab.csv --level A1 --budget 60
+#   python sharding.py show SourceData/A1/Verbs/CardSource
+#   python sharding.py budget SourceData/A1/Verbs/CardSource 12
+
+import argparse
+import json
+from pathlib import Path
+
+from helpers import atomic_open, iter_csv
+from id_service import default_service
+from verb_store import open_verb_store
+
+SHARDS_FILENAME = "deck_shards.json"
+SHARDS_VERSION = 1
+VERB_GROUP = "verbs"
+
+
+def shards_path(source) -> Path:
+    """ProcessData/deck_shards.json next to a CardSource folder, vocab CSV or .jsonl store."""
+    source = Path(source)
+    folder = source if source.is_dir() else source.parent
+    if folder.name == "CardSource":
+        folder = folder.parent
+    return folder / "ProcessData" / SHARDS_FILENAME
+
+
+class ShardMap:
+    """
+    Persisted member -> deck assignment for one source. `kind` is "verbs"
+    or "vocab", `prefix` the deck name prefix (Italian::A1::Verbs).
+    """
+
+    def __init__(self, path, kind: str, prefix: str, budget: int):
+        self.path = Path(path)
+        self.kind = kind
+        self.prefix = prefix
+        self.budget = budget
+        self.shards = []  # {"group", "name", "guid", "members"} in creation order
+        self.members = {}  # (group, member) -> shard
+        self.seen = set()
+        self.dirty = False
+
+    @classmethod
+    def open(cls, source):
+        """The shard map for `source`, or None if it doesn't use one."""
+        path = shards_path(source)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != SHARDS_VERSION:
+            raise ValueError(f"{path}: unsupported shard map version {data.get('version')}")
+        shard_map = cls(path, data["kind"], data["prefix"], data["budget"])
+        for shard in data["shards"]:
+            shard_map._add_shard(shard)
+        return shard_map
+
+    def _add_shard(self, shard: dict) -> dict:
+        self.shards.append(shard)
+        for member in shard["members"]:
+            self.members[(shard["group"], member)] = shard
+        return shard
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_open(self.path) as f:
+            json.dump({"version": SHARDS_VERSION, "kind": self.kind, "prefix": self.prefix,
+                       "budget": self.budget, "shards": self.shards}, f, ensure_ascii=False, indent=1)
+        self.dirty = False
+
+    def shard_name(self, group: str, number: int) -> str:
+        if self.kind == VERB_GROUP:
+            return f"{self.prefix}::Part {number}"
+        return f"{self.prefix}::{group}" if number == 1 else f"{self.prefix}::{group} {number}"
+
+    def _new_shard(self, group: str, count: int) -> dict:
+        names = {shard["name"] for shard in self.shards}
+        number = count + 1
+        while self.shard_name(group, number) in names:
+            number += 1
+        name = self.shard_name(group, number)
+        return self._add_shard({"group": group, "name": name, "guid": str(default_service().get(name)),
+                                "members": []})
+
+    def deck_for(self, group: str, member: str) -> tuple[str, str]:
+        """(deck name, deck GUID) for `member`, assigning it to a deck if it is new."""
+        key = (group, member)
+        self.seen.add(key)
+        shard = self.members.get(key)
+        if shard is None:
+            group_shards = [s for s in self.shards if s["group"] == group]
+            shard = next((s for s in group_shards if len(s["members"]) < self.budget), None)
+            if shard is None:
+                shard = self._new_shard(group, len(group_shards))
+            shard["members"].append(member)
+            self.members[key] = shard
+            self.dirty = True
+        return shard["name"], shard["guid"]
+
+    def prune(self) -> int:
+        """
+        After a full pass, drop members that deck_for didn't see. Their decks
+        keep their name and GUID (and take the next new members). The next
+        deck_for call starts a new pass.
+        """
+        removed = 0
+        for shard in self.shards:
+            kept = [m for m in shard["members"] if (shard["group"], m) in self.seen]
+            if len(kept) != len(shard["members"]):
+                for member in shard["members"]:
+                    if (shard["group"], member) not in self.seen:
+                        del self.members[(shard["group"], member)]
+                removed += len(shard["members"]) - len(kept)
+                shard["members"] = kept
+                self.dirty = True
+        self.seen = set()
+        return removed
+
+
+def seed_shards(source, level: str, budget: int) -> ShardMap:
+    """A shard map holding the deck assignments `source` has today."""
+    if str(source).endswith(".csv"):
+        shard_map = ShardMap(shards_path(source), "vocab", f"Italian::{level}::Vocab", budget)
+        rows = iter_csv(source)
+        col = {name.strip(): i for i, name in enumerate(next(rows))}
+        entries = [(row[col["Category"]].strip(), row[col["Italian"]].strip(), row[col["Deck Name"]].strip(),
+                    row[col["Deck GUID"]].strip()) for row in rows]
+    else:
+        shard_map = ShardMap(shards_path(source), VERB_GROUP, f"Italian::{level}::Verbs", budget)
+        entries = [(VERB_GROUP, infinitive, data.get("deck_name", ""), str(data.get("deck_guid", "")))
+                   for infinitive, data in open_verb_store(source).load().items()]
+
+    by_name = {}
+    for group, member, deck_name, deck_guid in entries:
+        if not deck_name or not deck_guid or (group, member) in shard_map.members:
+            continue  # unassigned members are placed by the next build
+        shard = by_name.get(deck_name)
+        if shard is None:
+            shard = by_name[deck_name] = shard_map._add_shard(
+                {"group": group, "name": deck_name, "guid": deck_guid, "members": []})
+        shard["members"].append(member)
+        shard_map.members[(group, member)] = shard
+    shard_map.shards.sort(key=lambda s: s["name"])
+    shard_map.dirty = True
+    return shard_map
+
+
+def print_shards(shard_map: ShardMap):
+    total = sum(len(s["members"]) for s in shard_map.shards)
+    print(f"{shard_map.path}: {len(shard_map.shards)} decks, {total} notes, budget {shard_map.budget}")
+    for shard in shard_map.shards:
+        over = " (over budget)" if len(shard["members"]) > shard_map.budget else ""
+        print(f"  {shard['name']} [{shard['guid']}]: {len(shard['members'])}{over}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage automatic deck sharding for a card source")
+    sub = parser.add_subparsers(dest="command", required=True)
+    init = sub.add_parser("init", help="Create the shard map from the source's current decks")
+    init.add_argument("source", help="Verb folder/.jsonl store or vocab CSV")
+    init.add_argument("--level", default="A1", help="CEFR level for new deck names (default: A1)")
+    init.add_argument("--budget", type=int, required=True, help="Most notes per deck")
+    init.add_argument("--force", action="store_true", help="Replace an existing shard map")
+    show = sub.add_parser("show", help="List the decks and their sizes")
+    show.add_argument("source")
+    budget = sub.add_parser("budget", help="Change the note budget for new assignments")
+    budget.add_argument("source")
+    budget.add_argument("budget", type=int)
+    args = parser.parse_args()
+
+    if args.command == "init":
+        if shards_path(args.source).exists() and not args.force:
+            print(f"Error: {shards_path(args.source)} already exists (use --force to replace it)")
+            return
+        shard_map = seed_shards(args.source, args.level, args.budget)
+        shard_map.save()
+        print_shards(shard_map)
+        return
+
+    shard_map = ShardMap.open(args.source)
+    if shard_map is None:
+        print(f"Error: {args.source} has no shard map ({shards_path(args.source)})")
+        return
+    if args.command == "budget":
+        shard_map.budget = args.budget
+        shard_map.dirty = True
+        shard_map.save()
+    print_shards(shard_map)
+
+
+if __name__ == "__main__":
+    main()
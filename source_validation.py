@@ -0,0 +1,210 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# source_validation.py
+# Reporting for schema validation, and a standalone check of the sources.
+#
+# The builds validate each verb and vocab row as it is loaded (see
+# load_verb_corpus and stream_vocab_rows), leave out the ones with fatal
+# errors (see schema_validator.FATAL_CODES) and report the errors with
+# finish_validation before packaging, so the sources are read only once.
+#
+# With --strict the sources are first checked by run_validation: verb
+# folders are split into chunks of files and every vocab CSV is its own
+# task, the tasks are read and checked by a pool of worker processes
+# (--jobs), and the errors come back in source order. A single fatal error
+# stops the build there, before any GUID is written back to a source.
+# Running this module on its own does the same check.
+#
+# Usage:
+#   python source_validation.py                   # every source in config.json
+#   python source_validation.py --level A1 --jobs 0
+
+import argparse
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from deck_packaging import resolve_jobs
+from instrumentation import BuildMetrics
+from schema_validator import (
+    SHORT_ROW,
+    UNREADABLE,
+    VERB_VALIDATOR,
+    VOCAB_VALIDATOR,
+    SchemaError,
+)
+from verb_store import STORE_SUFFIX
+
+
+class ValidationFailed(Exception):
+    """Raised in strict mode when the sources have fatal errors."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        fatal = sum(1 for e in errors if e.fatal)
+        super().__init__(f"{fatal} fatal validation errors, aborting before packaging")
+
+
+def _validate_verb_files(files: list) -> list[SchemaError]:
+    errors = []
+    for json_file in files:
+        try:
+            data = json.loads(Path(json_file).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            errors.append(SchemaError(str(json_file), "", UNREADABLE, str(e)))
+            continue
+        errors.extend(VERB_VALIDATOR.validate(data, str(json_file)))
+    return errors
+
+
+def _validate_verb_store(store_path: str) -> list[SchemaError]:
+    errors = []
+    try:
+        with open(store_path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError as e:
+                    errors.append(SchemaError(store_path, f"line[{line_no}]", UNREADABLE, str(e)))
+                    continue
+                errors.extend(VERB_VALIDATOR.validate(data, store_path))
+    except OSError as e:
+        errors.append(SchemaError(store_path, "", UNREADABLE, str(e)))
+    return errors
+
+
+def _validate_vocab_csv(csv_path: str) -> list[SchemaError]:
+    try:
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = [name.strip() for name in next(reader, [])]
+            errors = VOCAB_VALIDATOR.validate_header(header, csv_path)
+            rows = []
+            for values in reader:
+                if not any(cell.strip() for cell in values):
+                    continue
+                rows.append(dict(zip(header, values)))
+                if len(values) < len(header):
+                    errors.append(SchemaError(csv_path, f"row[{len(rows)}]", SHORT_ROW,
+                                              values[0].strip() if values else ""))
+    except OSError as e:
+        return [SchemaError(csv_path, "", UNREADABLE, str(e))]
+    return errors + VOCAB_VALIDATOR.validate_rows(rows, csv_path)
+
+
+def _run_task(task):
+    func, arg = task
+    return func(arg)
+
+
+def plan_tasks(verb_sources=(), vocab_sources=(), n_workers: int = 1) -> list:
+    """Split the sources into (function, argument) tasks, in source order."""
+    tasks = []
+    for source in verb_sources:
+        if str(source).endswith(STORE_SUFFIX):
+            tasks.append((_validate_verb_store, str(source)))
+            continue
+        files = [str(p) for p in sorted(Path(source).glob("*.json"))]
+        chunk = max(1, -(-len(files) // n_workers))
+        for i in range(0, len(files), chunk):
+            tasks.append((_validate_verb_files, files[i:i + chunk]))
+    for source in vocab_sources:
+        tasks.append((_validate_vocab_csv, str(source)))
+    return tasks
+
+
+def validate_sources(verb_sources=(), vocab_sources=(), jobs: int = 1) -> list[SchemaError]:
+    """Validate verb folders/stores and vocab CSVs across `jobs` worker processes."""
+    n_workers = resolve_jobs(jobs)
+    tasks = plan_tasks(verb_sources, vocab_sources, n_workers)
+    if n_workers == 1 or len(tasks) <= 1:
+        results = map(_run_task, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(tasks))) as executor:
+            results = list(executor.map(_run_task, tasks))
+    return [error for task_errors in results for error in task_errors]
+
+
+def print_validation(errors: list):
+    if not errors:
+        return
+    fatal = [e for e in errors if e.fatal]
+    warnings = [e for e in errors if not e.fatal]
+    print(f"\n=== VALIDATION ERRORS ({len(fatal)} fatal, {len(warnings)} warnings) ===")
+    for err in fatal:
+        print(f"  FATAL   {err}")
+    for err in warnings:
+        print(f"  WARNING {err}")
+    print()
+
+
+def report_validation(errors: list, strict: bool = False, metrics: BuildMetrics = None) -> list[SchemaError]:
+    """
+    Count and print validation errors and return them.
+    Raises ValidationFailed in `strict` mode if any error is fatal.
+    """
+    if metrics is None:
+        metrics = BuildMetrics()
+    fatal = sum(1 for e in errors if e.fatal)
+    metrics.count("validation_fatal", fatal)
+    metrics.count("validation_warnings", len(errors) - fatal)
+    print_validation(errors)
+    if strict and fatal:
+        raise ValidationFailed(errors)
+    return errors
+
+
+def finish_validation(errors: list, strict: bool = False, metrics: BuildMetrics = None) -> list[SchemaError]:
+    """
+    Report the errors a build collected while loading its sources. With
+    `strict` the sources already passed run_validation, which printed their
+    warnings, so only a fatal error that appeared since (a source edited
+    during the build) is reported, and raised as ValidationFailed.
+    """
+    if strict and not any(e.fatal for e in errors):
+        return errors
+    return report_validation(errors, strict=strict, metrics=metrics)
+
+
+def run_validation(verb_sources=(), vocab_sources=(), jobs: int = 1, strict: bool = False,
+                   metrics: BuildMetrics = None) -> list[SchemaError]:
+    """
+    Validate the sources, print the results and return the errors.
+    Raises ValidationFailed in `strict` mode if any error is fatal.
+    """
+    if metrics is None:
+        metrics = BuildMetrics()
+    with metrics.stage("validate"):
+        errors = validate_sources(verb_sources, vocab_sources, jobs=jobs)
+    return report_validation(errors, strict=strict, metrics=metrics)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the verb and vocab sources in config.json")
+    parser.add_argument("--level", action="append", dest="levels",
+                        help="Only validate this level (repeatable, default: all levels)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Worker processes (0 = one per CPU, default: 1)")
+    args = parser.parse_args()
+
+    with open(Path(__file__).parent / "config.json", "r", encoding="utf-8") as f:
+        config = json.load(f)
+    levels = args.levels or list(config["levels"].keys())
+    verb_sources = [config["levels"][lv]["verbs"]["source"] for lv in levels
+                    if "verbs" in config["levels"].get(lv, {})]
+    vocab_sources = [config["levels"][lv]["vocab"]["source"] for lv in levels
+                     if "vocab" in config["levels"].get(lv, {})]
+
+    errors = run_validation(verb_sources, vocab_sources, jobs=args.jobs)
+    fatal = sum(1 for e in errors if e.fatal)
+    print(f"Validated {len(verb_sources)} verb and {len(vocab_sources)} vocab sources: "
+          f"{fatal} fatal, {len(errors) - fatal} warnings")
+    sys.exit(1 if fatal else 0)
+
+
+if __name__ == "__main__":
+    main()
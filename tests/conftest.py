@@ -0,0 +1,53 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# tests/conftest.py
+# Fixtures for building decks from a throwaway copy of the A1 sources, so a
+# test run never stamps GUIDs into SourceData or writes to the .cache folder.
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import id_service  # noqa: E402
+import model_cache  # noqa: E402
+from build_all import build_all  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Keep the model cache out of the repo's .cache and start each test with fresh ids."""
+    monkeypatch.setattr(model_cache, "CACHE_PATH", tmp_path / ".cache" / "models.json")
+    monkeypatch.setattr(id_service, "_default", id_service.IdService())
+
+
+@pytest.fixture
+def build_level(tmp_path):
+    """
+    build_level(name, **build_all kwargs) builds a copy of SourceData/A1 into
+    tmp_path/name and returns {relative path: bytes} for every .apkg in it.
+    """
+    source = tmp_path / "SourceData" / "A1"
+    shutil.copytree(ROOT / "SourceData" / "A1", source, ignore=shutil.ignore_patterns("backup"))
+
+    def build(name: str, **kwargs) -> dict:
+        output = tmp_path / name
+        config = {
+            "output_root": str(output),
+            "levels": {
+                "A1": {
+                    "verbs": {"source": str(source / "Verbs" / "CardSource"),
+                              "output": str(output / "A1" / "Verbs")},
+                    "vocab": {"source": str(source / "Vocab" / "CardSource" / "A1_Vocab.csv"),
+                              "output": str(output / "A1" / "Vocab")},
+                }
+            },
+        }
+        build_all(config, **kwargs)
+        return {p.relative_to(output).as_posix(): p.read_bytes() for p in sorted(output.rglob("*.apkg"))}
+
+    return build
@@ -0,0 +1,21 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# tests/test_parallel_packaging.py
+# --jobs: packaging across a process pool writes the same bytes as packaging
+# serially.
+
+import pytest
+
+from deck_packaging import PACKAGE_WRITERS
+
+
+@pytest.mark.parametrize("writer", PACKAGE_WRITERS)
+def test_parallel_packages_match_serial(build_level, monkeypatch, writer):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    serial = build_level("serial", jobs=1, reproducible=True, writer=writer, package="both")
+    parallel = build_level("parallel", jobs=4, reproducible=True, writer=writer, package="both")
+
+    assert len(serial) > 4
+    assert sorted(serial) == sorted(parallel)
+    for name, data in serial.items():
+        assert data == parallel[name], f"{name} differs between jobs=1 and jobs=4"
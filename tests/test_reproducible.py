@@ -0,0 +1,43 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# tests/test_reproducible.py
+# --reproducible: building the same sources twice gives byte-identical .apkg
+# files, even when the wall clock has moved on between the builds.
+
+import time
+
+import pytest
+
+from deck_packaging import PACKAGE_WRITERS
+
+EPOCH = "1700000000"
+DAY = 24 * 60 * 60
+
+
+def later_clock(monkeypatch):
+    """Make time.time() run a day ahead for the rest of the test."""
+    now = time.time
+    monkeypatch.setattr(time, "time", lambda: now() + DAY)
+
+
+@pytest.mark.parametrize("writer", PACKAGE_WRITERS)
+def test_reproducible_builds_are_byte_identical(build_level, monkeypatch, writer):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", EPOCH)
+    first = build_level("first", reproducible=True, writer=writer, package="both")
+    later_clock(monkeypatch)
+    second = build_level("second", reproducible=True, writer=writer, package="both")
+
+    assert "A1/A1_Italian.apkg" in first
+    assert sorted(first) == sorted(second)
+    for name, data in first.items():
+        assert data == second[name], f"{name} differs between the two builds"
+
+
+def test_default_builds_follow_the_clock(build_level, monkeypatch):
+    # Checks the test above would notice a wall-clock timestamp
+    first = build_level("first")
+    later_clock(monkeypatch)
+    second = build_level("second")
+
+    assert sorted(first) == sorted(second)
+    assert all(data != second[name] for name, data in first.items())
@@ -0,0 +1,46 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# tests/test_schema_validator.py
+# Verb blocks of the wrong type are reported as fatal WRONG_TYPE errors
+# instead of crashing the validator.
+
+import json
+
+import pytest
+
+from conftest import ROOT
+from schema_validator import VERB_VALIDATOR, WRONG_TYPE
+
+
+@pytest.fixture
+def verb():
+    path = ROOT / "SourceData" / "A1" / "Verbs" / "CardSource" / "bere.json"
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def test_valid_verb_has_no_errors(verb):
+    assert VERB_VALIDATOR.validate(verb) == []
+
+
+@pytest.mark.parametrize("path, value", [
+    (("tenses",), "beve"),
+    (("tenses", "presente"), ["bevo"]),
+    (("tenses", "presente", "io"), "beve"),
+    (("participio_passato",), "bevuto"),
+])
+def test_wrong_typed_block_is_fatal(verb, path, value):
+    parent = verb
+    for key in path[:-1]:
+        parent = parent[key]
+    parent[path[-1]] = value
+
+    errors = VERB_VALIDATOR.validate(verb, "bere.json")
+
+    assert errors == [("bere.json", ".".join(path), WRONG_TYPE, "bere")]
+    assert errors[0].fatal
+
+
+def test_non_object_verb_is_fatal():
+    errors = VERB_VALIDATOR.validate([1, 2], "list.json")
+    assert [e.code for e in errors] == [WRONG_TYPE]
+    assert errors[0].fatal
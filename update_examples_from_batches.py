@@ -2,135 +2,173 @@
 """
 Enhanced Example Updater for Italian Verb JSON files
 
-This script processes multiple CSV batch files containing improved example sentences
+This script merges multiple CSV batch files containing improved example sentences
 and updates the corresponding verb JSON files with longer, more detailed examples.
 
+All batches are loaded into one index keyed by (infinitive, tense, person) and
+applied in a single pass over the verb store. Batches are applied in number
+order (batch2 before batch10), so when two batches disagree the later batch
+wins. Only verb files whose examples actually change are rewritten.
+The edits are collected as a change set first (see change_set.py), so
+--dry-run shows what would change without writing anything.
+
 CSV Format expected:
 infinitive,tense,person,new_example,new_example_english
 
-Usage: python update_examples_from_batches.py
+Usage: python update_examples_from_batches.py [--source DIR] [--batch-dir DIR] [--verbose]
+                                              [--dry-run] [--save-changes PATH] [--apply-changes PATH]
 """
 
-import json
+import argparse
 import csv
-import os
-import glob
+import json
+import re
 from pathlib import Path
 
+from change_set import TrackedStore, add_change_set_arguments, apply_saved_changes, finish
+
+BATCH_PATTERN = "example_improvements_batch*.csv"
+BATCH_COLUMNS = ("infinitive", "tense", "person", "new_example", "new_example_english")
+
+# Batch files spell the future tense correctly; the verb files keep the
+# historical "futuro_simplice" key (see schemas.VERB_TENSES).
+TENSE_ALIASES = {"futuro_semplice": "futuro_simplice"}
+
+
+def batch_number(path):
+    """Sort key so batch10 comes after batch9."""
+    match = re.search(r"(\d+)\.csv$", str(path))
+    return (int(match.group(1)) if match else 0, str(path))
+
+
+def shorten(text, limit=50):
+    return (text[:limit] + "...") if len(text) > limit else text
+
 
 class ExampleUpdater:
-    def __init__(self, verb_dir='SourceData/Verbs'):
+    def __init__(self, verb_dir='SourceData/A1/Verbs/CardSource',
+                 batch_dir='SourceData/A1/Verbs/ProcessData', verbose=False):
         self.verb_dir = Path(verb_dir)
+        self.batch_dir = Path(batch_dir)
+        self.verbose = verbose
+        self.store = TrackedStore(verb_dir)
         self.batch_files = []
+        self.conflicts = []
+        self.incomplete = []
         self.updates_applied = 0
+        self.updates_unchanged = 0
         self.files_updated = 0
 
         # Find all batch CSV files
         self.find_batch_files()
 
     def find_batch_files(self):
-        """Find all example improvement batch CSV files"""
-        pattern = "example_improvements_batch*.csv"
-        self.batch_files = sorted(glob.glob(pattern))
-        print(f"Found {len(self.batch_files)} batch files: {self.batch_files}")
+        """Find all example improvement batch CSV files in the batch folder"""
+        self.batch_files = sorted(self.batch_dir.glob(BATCH_PATTERN), key=batch_number)
+        print(f"Found {len(self.batch_files)} batch files in {self.batch_dir}")
 
     def load_all_batch_data(self):
-        """Load example improvements from all batch CSV files"""
-        all_examples = {}
+        """
+        Load every batch into one index:
+        {(infinitive, tense, person): (example, example_english, source)}.
+        A later batch (or a later row in the same batch) replaces an earlier
+        entry; replacements with different text are recorded in self.conflicts.
+        Rows with an empty or missing column are skipped and recorded in
+        self.incomplete.
+        """
+        index = {}
 
         for batch_file in self.batch_files:
-            print(f"Loading {batch_file}...")
             try:
-                with open(batch_file, 'r', encoding='utf-8') as file:
+                with open(batch_file, 'r', encoding='utf-8', newline='') as file:
                     reader = csv.DictReader(file)
+                    missing = [col for col in BATCH_COLUMNS if col not in (reader.fieldnames or ())]
+                    if missing:
+                        print(f"Error loading {batch_file}: missing columns {', '.join(missing)}")
+                        continue
                     batch_count = 0
 
-                    for row in reader:
-                        infinitive = row['infinitive'].strip()
-                        tense = row['tense'].strip()
-                        person = row['person'].strip()
-                        new_example = row['new_example'].strip()
-                        new_example_english = row['new_example_english'].strip()
-
-                        if infinitive not in all_examples:
-                            all_examples[infinitive] = {}
-                        if tense not in all_examples[infinitive]:
-                            all_examples[infinitive][tense] = {}
-
-                        all_examples[infinitive][tense][person] = {
-                            'example': new_example,
-                            'example_english': new_example_english
-                        }
+                    for line_no, row in enumerate(reader, 2):
+                        source = f"{batch_file.name}:{line_no}"
+                        values = {col: (row.get(col) or "").strip() for col in BATCH_COLUMNS}
+                        empty = [col for col, value in values.items() if not value]
+                        if empty:
+                            self.incomplete.append((source, empty))
+                            print(f"  Skipping {source}: empty {', '.join(empty)}")
+                            continue
+
+                        tense = values['tense']
+                        key = (values['infinitive'], TENSE_ALIASES.get(tense, tense), values['person'])
+                        value = (values['new_example'], values['new_example_english'], source)
+
+                        previous = index.get(key)
+                        if previous is not None and previous[:2] != value[:2]:
+                            self.conflicts.append((key, previous, value))
+                        index[key] = value
                         batch_count += 1
 
-                    print(f"  Loaded {batch_count} example updates from {batch_file}")
+                    if self.verbose:
+                        print(f"  Loaded {batch_count} example updates from {batch_file.name}")
 
-            except Exception as e:
+            except (OSError, UnicodeDecodeError, csv.Error) as e:
                 print(f"Error loading {batch_file}: {e}")
                 continue
 
-        total_verbs = len(all_examples)
-        total_updates = sum(
-            len(tenses) * len(persons)
-            for tenses in all_examples.values()
-            for persons in tenses.values()
-        )
-        print(f"Total: {total_updates} example updates for {total_verbs} verbs")
-        return all_examples
-
-    def update_verb_file(self, infinitive, example_data):
-        """Update a single verb JSON file with new examples"""
-        file_path = self.verb_dir / f"{infinitive}.json"
-
-        if not file_path.exists():
-            print(f"⚠️  File not found: {file_path}")
-            return False
-
-        try:
-            # Load existing verb data
-            with open(file_path, 'r', encoding='utf-8') as file:
-                verb_data = json.load(file)
-
-            # Track updates for this file
-            file_updates = 0
+        total_verbs = len({infinitive for infinitive, _, _ in index})
+        print(f"Total: {len(index)} example updates for {total_verbs} verbs "
+              f"({len(self.conflicts)} conflicts resolved in favour of the later batch, "
+              f"{len(self.incomplete)} incomplete rows skipped)")
+        if self.verbose:
+            for (infinitive, tense, person), old, new in self.conflicts:
+                print(f"    {infinitive} {tense}.{person}: {old[2]} overridden by {new[2]}")
+        return index
+
+    def apply_updates(self, index):
+        """
+        Apply the index in one pass, verb by verb. Returns (missing_verbs,
+        missing_slots): verbs not in the store and tense/person slots the
+        verb does not have.
+        """
+        by_verb = {}
+        for (infinitive, tense, person), value in index.items():
+            by_verb.setdefault(infinitive, []).append((tense, person, value))
+
+        missing_verbs = []
+        missing_slots = []
+        for infinitive in sorted(by_verb):
+            verb_data = self.store.get(infinitive)
+            if verb_data is None:
+                missing_verbs.append(infinitive)
+                continue
 
-            # Update examples in tenses
-            if 'tenses' in verb_data:
-                for tense_name, tense_data in verb_data['tenses'].items():
-                    if tense_name in example_data:
-                        for person, person_data in tense_data.items():
-                            if person in example_data[tense_name]:
-                                if isinstance(person_data, dict):
-                                    # Update the example sentences
-                                    old_example = person_data.get('example', '')
-                                    old_example_english = person_data.get('example_english', '')
-
-                                    person_data['example'] = example_data[tense_name][person]['example']
-                                    person_data['example_english'] = example_data[tense_name][person]['example_english']
-
-                                    file_updates += 1
-                                    self.updates_applied += 1
-
-                                    # Show what changed (truncated for readability)
-                                    old_short = (old_example[:50] + "...") if len(old_example) > 50 else old_example
-                                    new_short = (person_data['example'][:50] + "...") if len(person_data['example']) > 50 else person_data['example']
-                                    print(f"    {tense_name}.{person}: '{old_short}' → '{new_short}'")
-
-            if file_updates > 0:
-                # Save updated verb data
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    json.dump(verb_data, file, ensure_ascii=False, indent=2)
-
-                print(f"✅ Updated {infinitive}.json ({file_updates} examples)")
+            tenses = verb_data.get('tenses', {})
+            file_updates = 0
+            for tense, person, (example, example_english, source) in by_verb[infinitive]:
+                person_data = tenses.get(tense, {}).get(person)
+                if not isinstance(person_data, dict):
+                    missing_slots.append((infinitive, tense, person, source))
+                    continue
+                if (person_data.get('example') == example
+                        and person_data.get('example_english') == example_english):
+                    self.updates_unchanged += 1
+                    continue
+
+                if self.verbose:
+                    print(f"    {infinitive} {tense}.{person}: "
+                          f"'{shorten(person_data.get('example', ''))}' → '{shorten(example)}'")
+                person_data['example'] = example
+                person_data['example_english'] = example_english
+                file_updates += 1
+
+            if file_updates:
+                # Stage updated verb data; nothing is written until the change set is applied
+                self.store.put(infinitive, verb_data)
+                self.updates_applied += file_updates
                 self.files_updated += 1
-                return True
-            else:
-                print(f"ℹ️  No updates needed for {infinitive}.json")
-                return False
+                if self.verbose:
+                    print(f"✅ Updated {infinitive} ({file_updates} examples)")
 
-        except Exception as e:
-            print(f"❌ Error updating {infinitive}.json: {e}")
-            return False
+        return missing_verbs, missing_slots
 
     def process_all_updates(self):
         """Process all example updates from batch files"""
@@ -139,39 +177,63 @@ class ExampleUpdater:
         print("=" * 60)
 
         # Load all batch data
-        all_examples = self.load_all_batch_data()
+        index = self.load_all_batch_data()
 
-        if not all_examples:
+        if not index:
             print("❌ No example data loaded from batch files")
             return
 
         print(f"\n📝 Processing example updates...")
-        print("-" * 40)
-
-        # Update each verb file
-        for infinitive, example_data in all_examples.items():
-            print(f"\n🔄 Updating {infinitive}...")
-            self.update_verb_file(infinitive, example_data)
+        missing_verbs, missing_slots = self.apply_updates(index)
 
         # Summary
         print("\n" + "=" * 60)
         print("UPDATE SUMMARY")
         print("=" * 60)
-        print(f"✅ Files updated: {self.files_updated}")
+        print(f"✅ Files changed: {self.files_updated}")
         print(f"🔄 Total example updates applied: {self.updates_applied}")
+        print(f"ℹ️  Already up to date: {self.updates_unchanged}")
         print(f"📁 Batch files processed: {len(self.batch_files)}")
 
+        if missing_verbs:
+            print(f"⚠️  Verbs not found in {self.verb_dir}: {', '.join(missing_verbs)}")
+        if missing_slots:
+            print(f"⚠️  {len(missing_slots)} updates name a tense/person the verb file lacks")
+            if self.verbose:
+                for infinitive, tense, person, source in missing_slots:
+                    print(f"    {infinitive} {tense}.{person} ({source})")
+
         if self.files_updated > 0:
             print(f"\n🎉 Successfully enhanced examples for {self.files_updated} verb files!")
         else:
-            print(f"\n⚠️  No files were updated. Check batch file format and verb file availability.")
+            print(f"\nℹ️  No files needed changes.")
 
 
 def main():
     """Main execution function"""
-    updater = ExampleUpdater()
+    config_path = Path(__file__).parent / "config.json"
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    verb_source = config["levels"]["A1"]["verbs"]["source"]
+
+    parser = argparse.ArgumentParser(description="Merge example improvement batches into the verb files")
+    parser.add_argument("--source", default=verb_source,
+                        help=f"Verb folder or .jsonl store (default: {verb_source})")
+    parser.add_argument("--batch-dir",
+                        help="Folder with the batch CSVs (default: ProcessData next to the verb source)")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Print every changed example and every conflict")
+    add_change_set_arguments(parser)
+    args = parser.parse_args()
+
+    if apply_saved_changes(args):
+        return
+
+    batch_dir = args.batch_dir or Path(args.source).parent / "ProcessData"
+    updater = ExampleUpdater(args.source, batch_dir, verbose=args.verbose)
     updater.process_all_updates()
+    finish(updater.store, args, verbose=args.verbose)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
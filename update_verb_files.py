@@ -1,16 +1,17 @@
 #!/usr/bin/env python3
 
-import json
+import argparse
 import csv
-import os
-import shutil
-from datetime import datetime
-from typing import Dict, List, Tuple
+
+from change_set import TrackedStore, add_change_set_arguments, apply_saved_changes, finish
 
 class VerbFileUpdater:
-    def __init__(self, csv_file='verb_enhancements.csv', verb_dir='SourceData/Verbs'):
+    def __init__(self, csv_file='SourceData/A1/Verbs/ProcessData/verb_enhancements.csv',
+                 verb_dir='SourceData/A1/Verbs/CardSource'):
         self.csv_file = csv_file
         self.verb_dir = verb_dir
+        # Edits are tracked, not written; main() turns them into a change set
+        self.store = TrackedStore(verb_dir)
         self.enhancements = {}
         self.reflexive_pronouns = {
             'io': 'mi',
@@ -30,13 +31,6 @@ class VerbFileUpdater:
                 self.enhancements[row['infinitive']] = row
         print(f"Loaded enhancement data for {len(self.enhancements)} verbs")
 
-    def backup_files(self):
-        """Create backup of current verb files"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_dir = f"{self.verb_dir}_backup_{timestamp}"
-        shutil.copytree(self.verb_dir, backup_dir)
-        print(f"Created backup in: {backup_dir}")
-
     def convert_pronunciation_to_ipa(self, old_pronunciation, infinitive_ipa):
         """Convert simplified phonetic to IPA format based on patterns"""
         if old_pronunciation.startswith('/') and old_pronunciation.endswith('/'):
@@ -194,27 +188,22 @@ class VerbFileUpdater:
 
     def update_single_verb(self, infinitive):
         """Update a single verb file"""
-        file_path = os.path.join(self.verb_dir, f"{infinitive}.json")
-
-        if not os.path.exists(file_path):
-            print(f"Warning: File not found for {infinitive}")
-            return False
-
         if infinitive not in self.enhancements:
             print(f"Warning: No enhancement data for {infinitive}")
             return False
 
         try:
             # Load current verb data
-            with open(file_path, 'r', encoding='utf-8') as f:
-                verb_data = json.load(f)
+            verb_data = self.store.get(infinitive)
+            if verb_data is None:
+                print(f"Warning: File not found for {infinitive}")
+                return False
 
             # Apply enhancements
             updated_data = self.update_verb_structure(verb_data, self.enhancements[infinitive])
 
-            # Save updated data
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(updated_data, f, ensure_ascii=False, indent=2)
+            # Stage updated data; it is written when the change set is applied
+            self.store.put(infinitive, updated_data)
 
             print(f"✓ Updated {infinitive}.json")
             return True
@@ -227,9 +216,6 @@ class VerbFileUpdater:
         """Update all verb files"""
         print("Starting systematic update of all verb files...")
 
-        # Create backup first
-        self.backup_files()
-
         success_count = 0
         total_count = len(self.enhancements)
 
@@ -251,11 +237,10 @@ class VerbFileUpdater:
         issues = []
 
         for infinitive in self.enhancements.keys():
-            file_path = os.path.join(self.verb_dir, f"{infinitive}.json")
-
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    verb_data = json.load(f)
+                verb_data = self.store.get(infinitive)
+                if verb_data is None:
+                    raise FileNotFoundError(f"{infinitive} not found in {self.verb_dir}")
 
                 # Check required fields
                 required_fields = ['part_of_speech', 'context', 'synonyms', 'tenses']
@@ -284,14 +269,29 @@ def main():
     print("Italian Verb File Updater")
     print("=" * 40)
 
-    updater = VerbFileUpdater()
+    parser = argparse.ArgumentParser(description="Apply verb_enhancements.csv to the verb files")
+    parser.add_argument("--csv", default='SourceData/A1/Verbs/ProcessData/verb_enhancements.csv',
+                        help="Enhancement CSV")
+    parser.add_argument("--source", default='SourceData/A1/Verbs/CardSource',
+                        help="Verb folder or .jsonl store")
+    parser.add_argument("--verbose", action="store_true", help="List every change")
+    add_change_set_arguments(parser)
+    args = parser.parse_args()
+
+    if apply_saved_changes(args):
+        return
 
-    # Update all verb files
+    updater = VerbFileUpdater(args.csv, args.source)
+
+    # Update all verb files (in memory)
     updater.update_all_verbs()
 
-    # Validate updates
+    # Validate the updated data before anything is written
     updater.validate_updates()
 
+    # Backs up and rewrites only the verbs that changed, unless --dry-run
+    finish(updater.store, args, verbose=args.verbose)
+
     print("\nProcess complete!")
 
 if __name__ == "__main__":
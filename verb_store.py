@@ -0,0 +1,286 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# verb_store.py
+# Uniform access to a level's verb data, stored either as one pretty-printed
+# JSON file per verb (the CardSource folder layout) or as a single compact
+# JSON-lines file with one verb per line. The generator and the updater
+# scripts use open_verb_store() so either layout works as a source.
+#
+# A folder is read with up to `io_threads` file reads in flight at once, so
+# on a network share the per-file latency overlaps instead of adding up.
+# Files are still parsed in filename order as their reads complete, so the
+# loaded verbs (and the decks built from them) don't depend on the threads.
+#
+# Usage:
+#   python verb_store.py import SourceData/A1/Verbs/CardSource SourceData/A1/Verbs/A1_Verbs.jsonl
+#   python verb_store.py export SourceData/A1/Verbs/A1_Verbs.jsonl SourceData/A1/Verbs/CardSource
+
+import argparse
+import collections
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from helpers import atomic_open, file_mode
+
+STORE_SUFFIX = ".jsonl"
+DEFAULT_IO_THREADS = 8
+READ_AHEAD_PER_THREAD = 4  # bounds how many unparsed files are held in memory
+
+
+def dump_verb_file(verb_data: dict) -> str:
+    """Serialize a verb the way the per-verb JSON files are written."""
+    return json.dumps(verb_data, ensure_ascii=False, indent=2)
+
+
+class FolderVerbStore:
+    """One <infinitive>.json file per verb in a folder."""
+
+    def __init__(self, folder, io_threads: int = DEFAULT_IO_THREADS):
+        self.path = Path(folder)
+        self.io_threads = io_threads
+        self._verbs = {}
+        self._files = {}
+        self._loaded = False
+        self._dirty = set()
+
+    def load(self) -> dict:
+        """Parse every file once and return {infinitive: verb_data} sorted by filename."""
+        if not self._loaded:
+            for infinitive, data in self.iter_verbs():
+                self._verbs[infinitive] = data
+            self._loaded = True
+        return self._verbs
+
+    def iter_verbs(self, on_error=None):
+        """
+        Yield (infinitive, verb_data) in filename order without keeping the
+        parsed verbs, so a single pass over a large folder holds one at a time.
+        A file that can't be read or isn't a JSON object is passed to
+        on_error(file, where, error) and skipped; without on_error the error
+        is raised.
+        """
+        if self._loaded:
+            yield from self._verbs.items()
+            return
+        json_files = sorted(self.path.glob("*.json"))
+        for json_file, text in zip(json_files, self._read_files(json_files)):
+            try:
+                if isinstance(text, Exception):
+                    raise text
+                data = json.loads(text)
+                if not isinstance(data, dict):
+                    raise TypeError(f"expected a JSON object, got {type(data).__name__}")
+            except (OSError, ValueError, TypeError) as e:
+                if on_error is None:
+                    raise
+                on_error(str(json_file), "", e)
+                continue
+            infinitive = data.get("infinitive")
+            if not infinitive or not isinstance(infinitive, str):
+                infinitive = json_file.stem
+            self._files[infinitive] = json_file
+            yield infinitive, data
+
+    def _read_file(self, json_file: Path) -> str:
+        return json_file.read_text(encoding="utf-8")
+
+    def _try_read_file(self, json_file: Path):
+        """The file's text, or the error reading or decoding it raised."""
+        try:
+            return self._read_file(json_file)
+        except (OSError, UnicodeDecodeError) as e:
+            return e
+
+    def _read_files(self, json_files: list[Path]):
+        """
+        Yield the text of each file (or its read error) in order while the
+        next reads are in flight.
+        """
+        if self.io_threads <= 1 or len(json_files) < 2:
+            yield from map(self._try_read_file, json_files)
+            return
+        window = self.io_threads * READ_AHEAD_PER_THREAD
+        with ThreadPoolExecutor(max_workers=self.io_threads) as pool:
+            pending = collections.deque()
+            for json_file in json_files:
+                pending.append(pool.submit(self._try_read_file, json_file))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def get(self, infinitive: str):
+        """Return one verb, reading only its file if the folder isn't loaded yet."""
+        if infinitive in self._verbs or self._loaded:
+            return self._verbs.get(infinitive)
+        json_file = self.source_of(infinitive)
+        if not json_file.exists():
+            return None
+        self._verbs[infinitive] = json.loads(self._read_file(json_file))
+        self._files[infinitive] = json_file
+        return self._verbs[infinitive]
+
+    def put(self, infinitive: str, verb_data: dict):
+        self._verbs[infinitive] = verb_data
+        self._dirty.add(infinitive)
+
+    def mark_changed(self, infinitive: str):
+        self._dirty.add(infinitive)
+
+    def source_of(self, infinitive: str) -> Path:
+        return self._files.get(infinitive, self.path / f"{infinitive}.json")
+
+    def save(self) -> int:
+        """
+        Write only the verbs that changed. Returns the number of files written.
+        Every file is written to a temporary file first and only then renamed
+        into place, so a failure part way leaves all the verb files untouched.
+        (helpers.atomic_open renames each file as it is closed, so it can't
+        give that guarantee without holding every file open at once.)
+        """
+        staged = []
+        try:
+            for infinitive in sorted(self._dirty):
+                json_file = self.source_of(infinitive)
+                fd, tmp_path = tempfile.mkstemp(dir=json_file.parent, prefix=json_file.name + ".",
+                                                suffix=".tmp")
+                staged.append((infinitive, tmp_path, json_file))
+                with open(fd, "w", encoding="utf-8") as f:
+                    f.write(dump_verb_file(self._verbs[infinitive]))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(tmp_path, file_mode(json_file))
+        except BaseException:
+            for _, tmp_path, _ in staged:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            raise
+
+        for infinitive, tmp_path, json_file in staged:
+            os.replace(tmp_path, json_file)
+            self._files[infinitive] = json_file
+        written = len(self._dirty)
+        self._dirty.clear()
+        return written
+
+
+class JsonlVerbStore:
+    """All verbs for a level in one JSON-lines file, sorted by infinitive."""
+
+    def __init__(self, store_path):
+        self.path = Path(store_path)
+        self._verbs = None
+        self._dirty = False
+
+    def load(self) -> dict:
+        if self._verbs is None:
+            self._verbs = dict(self.iter_verbs())
+        return self._verbs
+
+    def iter_verbs(self, on_error=None):
+        """
+        Yield (infinitive, verb_data) line by line without keeping the parsed
+        verbs. A line that isn't a JSON verb with an infinitive is passed to
+        on_error(file, where, error) and skipped, or raised without on_error.
+        """
+        if self._verbs is not None:
+            yield from self._verbs.items()
+            return
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                    infinitive = data["infinitive"]
+                    if not isinstance(infinitive, str):
+                        raise TypeError(f"infinitive is {type(infinitive).__name__}, not str")
+                except (ValueError, KeyError, TypeError) as e:
+                    if on_error is None:
+                        raise
+                    on_error(str(self.path), f"line[{line_no}]", e)
+                    continue
+                yield infinitive, data
+
+    def get(self, infinitive: str):
+        return self.load().get(infinitive)
+
+    def put(self, infinitive: str, verb_data: dict):
+        self.load()[infinitive] = verb_data
+        self._dirty = True
+
+    def mark_changed(self, infinitive: str):
+        self._dirty = True
+
+    def source_of(self, infinitive: str) -> Path:
+        return self.path
+
+    def save(self) -> int:
+        """Rewrite the store (atomically) if anything changed. Returns 1 or 0."""
+        if not self._dirty:
+            return 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_open(self.path, newline="\n") as f:
+            for infinitive in sorted(self._verbs):
+                f.write(json.dumps(self._verbs[infinitive], ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+        self._dirty = False
+        return 1
+
+
+def open_verb_store(path, io_threads: int = DEFAULT_IO_THREADS):
+    """
+    Open a verb store: a .jsonl file, or otherwise a folder of per-verb JSON
+    files read with `io_threads` concurrent reads (1 reads them one by one).
+    """
+    if str(path).endswith(STORE_SUFFIX):
+        return JsonlVerbStore(path)
+    return FolderVerbStore(path, io_threads=io_threads)
+
+
+def import_folder(json_folder, store_path) -> int:
+    """Consolidate a folder of per-verb JSON files into a .jsonl store."""
+    verbs = FolderVerbStore(json_folder).load()
+    store = JsonlVerbStore(store_path)
+    store._verbs = dict(verbs)
+    store._dirty = True
+    store.save()
+    return len(verbs)
+
+
+def export_store(store_path, json_folder) -> int:
+    """Write every verb in a .jsonl store back out as <infinitive>.json files."""
+    verbs = JsonlVerbStore(store_path).load()
+    folder = FolderVerbStore(json_folder)
+    folder.path.mkdir(parents=True, exist_ok=True)
+    for infinitive, data in verbs.items():
+        folder.put(infinitive, data)
+    return folder.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert between verb folders and .jsonl verb stores")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Folder of per-verb JSON files -> .jsonl store")
+    imp.add_argument("folder")
+    imp.add_argument("store")
+    exp = sub.add_parser("export", help=".jsonl store -> folder of per-verb JSON files")
+    exp.add_argument("store")
+    exp.add_argument("folder")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        count = import_folder(args.folder, args.store)
+        print(f"Imported {count} verbs from {args.folder} into {args.store}")
+    else:
+        count = export_store(args.store, args.folder)
+        print(f"Exported {count} verbs from {args.store} into {args.folder}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+# Copyright (C) 2026 Christopher C Berry All Rights Reserved.
+# _______________________________________________
+# watch_build.py
+# Watch mode for build_all.py (--watch). Models and the parsed source data
+# stay in memory; the configured source paths are polled for changes and
+# only the decks whose verb files or vocab rows changed are re-planned and
+# packaged. Polling keeps it dependency-free and works the same on every OS.
+#
+# Files the build itself writes (GUIDs filled into the CSV or a verb file)
+# are re-snapshotted afterwards so they do not trigger another rebuild.
+#
+# The resident data is kept as VerbRecords and VocabRecords, not the parsed
+# JSON or CSV rows. A verb that fails validation fatally keeps its last good
+# record until it is fixed. Vocab rows with fatal errors are left out, as in
+# a full build; the CSV keeps its last good records only while it can't be
+# read or its header is missing a required column.
+#
+# With --package level or both, every cycle that changes a level's decks
+# also re-plans all of that level's decks and rebuilds its combined package.
+#
+# Verb sources with a shard map get their decks from it like a full build:
+# the map stays open, changed verbs are assigned through deck_for and every
+# verb file still present is marked seen before the map is pruned.
+
+import json
+import os
+import time
+from pathlib import Path
+
+import GenerateAnkiDeck_cgpt as verb_gen
+import GenerateVocabDeck as vocab_gen
+from deck_packaging import DEFAULT_WRITER, package_settings, write_pending
+from helpers import atomic_open
+from id_service import default_service
+from instrumentation import BuildMetrics
+from schema_validator import UNREADABLE, VERB_VALIDATOR, SchemaError
+from sharding import VERB_GROUP, ShardMap
+from source_validation import print_validation
+from verb_store import STORE_SUFFIX, JsonlVerbStore, dump_verb_file
+
+POLL_INTERVAL = 0.5
+
+
+def snapshot(source) -> dict:
+    """Return {path: (mtime_ns, size)} for a file, or for every *.json in a folder."""
+    source = Path(source)
+    try:
+        if source.is_dir():
+            return {entry.path: (st.st_mtime_ns, st.st_size)
+                    for entry in os.scandir(source)
+                    if entry.name.endswith(".json") and entry.is_file()
+                    for st in (entry.stat(),)}
+        st = source.stat()
+    except OSError:
+        return {}
+    return {str(source): (st.st_mtime_ns, st.st_size)}
+
+
+class WatchedSource:
+    """One (level, card type) source: its resident data and the decks still to rebuild."""
+    card_type = None
+
+    def __init__(self, level: str, source: str, output: str):
+        self.level = level
+        self.source = source
+        self.output = output
+        self.files = {}
+        self.affected = set()
+
+    def poll(self) -> set:
+        """Return the paths that were added, changed or removed since the last poll."""
+        current = snapshot(self.source)
+        changed = {p for p in current.keys() | self.files.keys() if current.get(p) != self.files.get(p)}
+        self.files = current
+        return changed
+
+    def resnapshot(self):
+        self.files = snapshot(self.source)
+
+
+class VerbSource(WatchedSource):
+    card_type = "verbs"
+
+    def __init__(self, level: str, source: str, output: str):
+        super().__init__(level, source, output)
+        # VerbRecords keyed by file path (folder) or infinitive (.jsonl store)
+        self.verbs = {}
+        # Infinitive of every verb in the source, valid or not, by the same keys
+        self.members = {}
+        self.shards = ShardMap.open(source)
+
+    def _assign(self, data: dict) -> bool:
+        """Fill in note_guid and the shard deck as load_verb_corpus does. True if data changed."""
+        infinitive = data.get("infinitive")
+        if not infinitive:
+            return False  # reported by validation
+        changed = False
+        if not data.get("note_guid"):
+            data["note_guid"] = default_service().get(infinitive)
+            changed = True
+        if self.shards is not None:
+            deck_name, deck_guid = self.shards.deck_for(VERB_GROUP, infinitive)
+            if data.get("deck_name") != deck_name or str(data.get("deck_guid")) != deck_guid:
+                data["deck_name"] = deck_name
+                data["deck_guid"] = deck_guid
+                print(f"  Assigned {infinitive} to deck {deck_name}")
+                changed = True
+        return changed
+
+    def _prune_shards(self):
+        if self.shards is None:
+            return
+        for infinitive in self.members.values():
+            self.shards.deck_for(VERB_GROUP, infinitive)
+        self.shards.prune()
+        self.shards.save()
+
+    def _read_changed(self, changed: set):
+        """Return ({key: verb_data or None}, errors) for the changed paths."""
+        errors = []
+        if str(self.source).endswith(STORE_SUFFIX):
+            store = JsonlVerbStore(self.source)
+            try:
+                verbs = store.load()
+            except (OSError, ValueError) as e:
+                return {}, [SchemaError(str(self.source), "", UNREADABLE, str(e))]
+            for infinitive, data in verbs.items():
+                if self._assign(data):
+                    store.mark_changed(infinitive)
+            self.members = {infinitive: infinitive for infinitive in verbs}
+            self._prune_shards()
+            store.save()
+            updates = {key: None for key in self.verbs.keys() - verbs.keys()}
+            updates.update(verbs)
+            return updates, errors
+
+        updates = {}
+        for path in changed:
+            if not os.path.exists(path):
+                updates[path] = None
+                self.members.pop(path, None)
+                continue
+            try:
+                data = json.loads(Path(path).read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                # Probably caught mid-save; the next write will trigger again
+                errors.append(SchemaError(path, "", UNREADABLE, str(e)))
+                continue
+            if self._assign(data):
+                with atomic_open(path) as f:
+                    f.write(dump_verb_file(data))
+            if data.get("infinitive"):
+                self.members[path] = data["infinitive"]
+            updates[path] = data
+        self._prune_shards()
+        return updates, errors
+
+    def refresh(self, changed: set) -> list:
+        updates, errors = self._read_changed(changed)
+        for key, data in updates.items():
+            verb = None
+            if data is not None:
+                verb_errors = VERB_VALIDATOR.validate(data, str(key))
+                errors.extend(verb_errors)
+                if any(e.fatal for e in verb_errors):
+                    continue
+                verb = verb_gen.verb_record(data)
+            old = self.verbs.get(key)
+            if verb == old:
+                continue
+            for record in (old, verb):
+                if record and record.deck_guid:
+                    self.affected.add(str(record.deck_guid))
+            if verb is None:
+                self.verbs.pop(key, None)
+            else:
+                self.verbs[key] = verb
+        self.resnapshot()
+        return errors
+
+    def plan(self, models, force: bool, metrics: BuildMetrics, settings=None,
+             include_current: bool = False):
+        """Plan the affected decks, or with `include_current` every deck (see plan_verb_groups)."""
+        verbs = [v for _, v in sorted(self.verbs.items())
+                 if include_current or str(v.deck_guid) in self.affected]
+        if not verbs:
+            return [], []
+        return verb_gen.plan_verb_groups(verbs, self.output, models=models, force=force,
+                                         level=self.level, metrics=metrics,
+                                         include_current=include_current, settings=settings)
+
+
+class VocabSource(WatchedSource):
+    card_type = "vocab"
+
+    def __init__(self, level: str, source: str, output: str):
+        super().__init__(level, source, output)
+        # deck name -> list of VocabRecords, in CSV order
+        self.groups = {}
+
+    def refresh(self, changed: set) -> list:
+        errors = []
+        try:
+            rows = list(vocab_gen.stream_vocab_rows(self.source, level=self.level, errors=errors))
+        except (OSError, ValueError) as e:
+            self.resnapshot()
+            return [SchemaError(str(self.source), "", UNREADABLE, str(e))]
+        # Rows with fatal errors were already left out; only a file-level
+        # error (unreadable, required column missing) keeps the last good rows
+        if any(e.fatal and not e.path.startswith("row[") for e in errors):
+            self.resnapshot()
+            return errors
+
+        groups = {}
+        for record in vocab_gen.vocab_records(rows):
+            groups.setdefault(record.deck_name, []).append(record)
+        for deck_name in groups.keys() | self.groups.keys():
+            if groups.get(deck_name) != self.groups.get(deck_name):
+                self.affected.add(deck_name)
+        self.groups = groups
+        self.resnapshot()
+        return errors
+
+    def plan(self, model, force: bool, metrics: BuildMetrics, settings=None,
+             include_current: bool = False):
+        """Plan the affected decks, or with `include_current` every deck (see plan_decks)."""
+        names = self.groups if include_current else self.affected
+        records = [record for name in names for record in self.groups.get(name, ())]
+        if not records:
+            return [], []
+        return vocab_gen.plan_decks(records, self.output, model=model, force=force,
+                                    level=self.level, metrics=metrics,
+                                    include_current=include_current, settings=settings)
+
+
+class DeckWatcher:
+    def __init__(self, config: dict, levels=None, card_types=("verbs", "vocab"), jobs: int = 1,
+                 reproducible: bool = False, strict: bool = False, writer: str = DEFAULT_WRITER,
+                 package: str = "decks"):
+        self.config = config
+        self.card_types = card_types
+        self.jobs = jobs
+        self.writer = writer
+        self.reproducible = reproducible
+        self.strict = strict
+        self.per_deck = package in ("decks", "both")
+        self.per_level = package in ("level", "both")
+        self.sources = []
+        for level in levels or list(config["levels"].keys()):
+            for card_type in card_types:
+                paths = config["levels"].get(level, {}).get(card_type)
+                if not paths:
+                    continue
+                source_class = VerbSource if card_type == "verbs" else VocabSource
+                self.sources.append(source_class(level, paths["source"], paths["output"]))
+
+        # Built once and kept for the life of the watcher
+        self.models = {}
+        if any(s.card_type == "verbs" for s in self.sources):
+            self.models["verbs"] = (verb_gen.get_italian_verb_model(irregular=False),
+                                    verb_gen.get_italian_verb_model(irregular=True))
+        if any(s.card_type == "vocab" for s in self.sources):
+            self.models["vocab"] = vocab_gen.build_vocab_model()
+
+    def rebuild(self, changes: list, force: bool = False):
+        """Refresh the changed sources, then plan and package only their affected decks."""
+        start = time.perf_counter()
+        metrics = BuildMetrics()
+        errors = []
+        for source, changed in changes:
+            errors.extend(source.refresh(changed))
+        print_validation(errors)
+        if self.strict and any(e.fatal for e in errors):
+            print("Fatal validation errors, not rebuilding until they are fixed.")
+            return
+
+        # A level package holds every deck of its level, so a level with any
+        # affected deck has all of its sources planned
+        levels = {source.level for source, _ in changes if source.affected} if self.per_level else set()
+        settings = package_settings(self.reproducible, self.writer)
+        created = []
+        pending = []
+        level_planned = {level: [] for level in levels}
+        for source in self.sources:
+            whole_level = source.level in levels
+            if not source.affected and not whole_level:
+                continue
+            source_created, source_pending = source.plan(self.models[source.card_type], force, metrics,
+                                                         settings, include_current=whole_level)
+            if whole_level:
+                level_planned[source.level].extend(source_pending)
+            if self.per_deck:
+                created.extend(source_created)
+                pending.extend(source_pending)
+            source.affected.clear()
+        pending.extend(self.plan_level_packages(level_planned, force))
+        write_pending(pending, n_jobs=self.jobs, reproducible=self.reproducible, writer=self.writer)
+
+        written = [p for p in pending if not p.current]
+        for p in written:
+            print(f"  Rebuilt {p.info['filename']}")
+        print(f"Rebuilt {len(written)} packages ({len(pending) - len(written)} unchanged) "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def plan_level_packages(self, level_planned: dict, force: bool) -> list:
+        """The combined package of each level in `level_planned` {level: its planned decks}."""
+        from build_all import level_folder, plan_level_package  # build_all imports this module
+
+        packages = []
+        for level, planned in sorted(level_planned.items()):
+            package = plan_level_package(level, self.config["levels"][level], self.card_types, planned,
+                                         level_folder(self.config, level), force)
+            if package is not None:
+                packages.append(package)
+        return packages
+
+    def run(self, interval: float = POLL_INTERVAL, force: bool = False):
+        print("Initial build...")
+        self.rebuild([(source, source.poll()) for source in self.sources], force=force)
+
+        print(f"\nWatching {len(self.sources)} sources for changes (Ctrl+C to stop)...")
+        try:
+            while True:
+                time.sleep(interval)
+                changes = [(source, changed) for source in self.sources
+                           if (changed := source.poll())]
+                if changes:
+                    names = sorted(os.path.basename(p) for _, changed in changes for p in changed)
+                    print(f"\nChanged: {', '.join(names)}")
+                    self.rebuild(changes)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")